@@ -1,3 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product, repeat
+
+
+# A factor is a table over a tuple of boolean variables:
+# { (val1, val2, ...): number, ... }
+class Factor:
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def multiply(self, other):
+        variables = self.variables + tuple(v for v in other.variables if v not in self.variables)
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        table = {}
+        for vals in product((True, False), repeat=len(variables)):
+            table[vals] = self.table[tuple(vals[i] for i in mine)] * other.table[tuple(vals[i] for i in theirs)]
+        return Factor(variables, table)
+
+    def sum_out(self, var):
+        i = self.variables.index(var)
+        table = {}
+        for (vals, p) in self.table.items():
+            key = vals[:i] + vals[i + 1:]
+            table[key] = table.get(key, 0.0) + p
+        return Factor(self.variables[:i] + self.variables[i + 1:], table)
+
+    # Division by a factor over a subset of the variables, with 0/0 = 0
+    def divide(self, other):
+        idx = [self.variables.index(v) for v in other.variables]
+        table = {}
+        for (vals, p) in self.table.items():
+            q = other.table[tuple(vals[i] for i in idx)]
+            table[vals] = 0.0 if q == 0 else p / q
+        return Factor(self.variables, table)
+
+    def project(self, variables):
+        res = self
+        for v in self.variables:
+            if v not in variables:
+                res = res.sum_out(v)
+        return res
+
+    def restrict(self, var, value):
+        if var not in self.variables:
+            return self
+        i = self.variables.index(var)
+        table = {vals[:i] + vals[i + 1:]: p for (vals, p) in self.table.items() if vals[i] == value}
+        return Factor(self.variables[:i] + self.variables[i + 1:], table)
+
+
 class BayesNet:
 
     def __init__(self, ldep=None):  # Why not ldep={}? See footnote 1.
@@ -16,16 +69,105 @@ class BayesNet:
     def add(self, var, mothers, prob):
         self.dependencies.setdefault(var, {})[frozenset(mothers)] = prob
 
+    # Alternatively, the dependencies of a variable can be a
+    # parameterised CPT object (see cpt.py)
+    def addCpt(self, var, cpt):
+        self.dependencies[var] = cpt
+
     # Joint probability for a given conjunction of
     # all variables of the network
     def jointProb(self, conjunction):
         prob = 1.0
+        values = None
         for (var, val) in conjunction:
-            for (mothers, p) in self.dependencies[var].items():
+            deps = self.dependencies[var]
+            if not isinstance(deps, dict):
+                values = dict(conjunction) if values is None else values
+                if all(m in values for m in deps.mothers):
+                    p = deps.prob(values)
+                    prob *= (p if val else 1 - p)
+                continue
+            for (mothers, p) in deps.items():
                 if mothers.issubset(conjunction):
                     prob *= (p if val else 1 - p)
         return prob
 
+    # Dense NumPy representation for batched jointProb (requires numpy)
+    def compile(self):
+        from compiled_bn import CompiledBayesNet
+        return CompiledBayesNet(self)
+
+    def junctionTree(self, heuristic='min_fill'):
+        from junction_tree import JunctionTree
+        return JunctionTree(self, heuristic)
+
+    # Sampling estimate of P(variable=value | evidence), see bn_sampling.estimate
+    def approximateProb(self, variable, value, evidence=(), method='likelihood', **options):
+        from bn_sampling import estimate
+        (bn, evidence) = self._pruned([variable], evidence)
+        return estimate(bn, variable, value, evidence, method, **options)
+
+    # The given variables and all their ancestors
+    def ancestors(self, variables) -> set:
+        result, stack = set(), list(variables)
+        while stack:
+            v = stack.pop()
+            if v not in result:
+                result.add(v)
+                stack.extend(self.mothers(v))
+        return result
+
+    # Variables that can influence the distribution of `variables` given
+    # the evidence: within the ancestral subgraph (which drops the barren
+    # nodes), the part connected to the query in the moral graph once the
+    # evidence variables are removed (the rest is d-separated from it),
+    # plus the evidence variables adjacent to that part
+    def relevant(self, variables, evidence=()) -> set:
+        evidence = dict(evidence)
+        ancestral = self.ancestors(list(variables) + list(evidence))
+        moral = {v: set() for v in ancestral}
+        for v in ancestral:
+            family = [v] + self.mothers(v)
+            for a in family:
+                moral[a].update(u for u in family if u != a)
+
+        reached, stack = set(), [v for v in variables if v not in evidence]
+        while stack:
+            v = stack.pop()
+            if v not in reached:
+                reached.add(v)
+                stack.extend(u for u in moral[v] if u not in evidence and u not in reached)
+        return reached | {e for e in evidence if e in ancestral and (e in variables or moral[e] & reached)}
+
+    # Network over the relevant variables only, with the same
+    # P(variables | evidence). Mothers that were dropped are evidence
+    # variables, and the CPT is restricted to their observed values;
+    # an evidence variable only linked to the d-separated part of the
+    # network becomes a root that always takes its observed value.
+    def prune(self, variables, evidence=()):
+        evidence = dict(evidence)
+        keep = self.relevant(variables, evidence)
+        pruned = BayesNet()
+        for v in self.dependencies:
+            if v not in keep:
+                continue
+            outside = [m for m in self.mothers(v) if m not in keep]
+            if any(m not in evidence for m in outside):
+                pruned.add(v, [], 1.0 if evidence[v] else 0.0)
+                continue
+            if not isinstance(self.dependencies[v], dict):
+                pruned.addCpt(v, self.dependencies[v].restrict({m: evidence[m] for m in outside}))
+                continue
+            for (conj, p) in self.dependencies[v].items():
+                if all(evidence[m] == val for (m, val) in conj if m in outside):
+                    pruned.add(v, [(m, val) for (m, val) in conj if m not in outside], p)
+        return pruned
+
+    # Pruned network and the evidence still in it
+    def _pruned(self, variables, evidence):
+        bn = self.prune(variables, evidence)
+        return bn, [(e, val) for (e, val) in dict(evidence).items() if e in bn.dependencies]
+
     def _gen_conjunctions(self, variables: list) -> list:
         if not variables:
             return [[]]
@@ -43,10 +185,136 @@ class BayesNet:
             res.append([(variables[0], False)] + c)
         return res
 
-    def individualProb(self, variable, value):
-        conjs = [[(variable, value)] + c for c in
-                 self._gen_conjunctions([v for v in self.dependencies.keys() if v != variable])]
-        return sum([self.jointProb(c) for c in conjs])
+    # Lazily yields the conjunctions number start..stop-1 of the
+    # variables, in the same order as _gen_conjunctions: the bits of
+    # the counter (most significant first) are the negated values
+    def _iter_conjunctions(self, variables: list, start=0, stop=None):
+        n = len(variables)
+        for i in range(start, 2 ** n if stop is None else stop):
+            yield [(v, not (i >> (n - 1 - k)) & 1) for (k, v) in enumerate(variables)]
+
+    def _partialProb(self, variable, value, variables, start, stop):
+        return sum(self.jointProb([(variable, value)] + c)
+                   for c in self._iter_conjunctions(variables, start, stop))
+
+    # With workers, the enumeration is split into `chunks` ranges
+    # that are summed in separate processes
+    def individualProb(self, variable, value, workers=None, chunks=None):
+        pruned = self.prune([variable])
+        if len(pruned.dependencies) < len(self.dependencies):
+            return pruned.individualProb(variable, value, workers, chunks)
+
+        variables = [v for v in self.dependencies.keys() if v != variable]
+        total = 2 ** len(variables)
+        if not workers:
+            return self._partialProb(variable, value, variables, 0, total)
+
+        chunks = min(total, chunks or 4 * workers)
+        bounds = [total * k // chunks for k in range(chunks + 1)]
+        with ProcessPoolExecutor(workers) as executor:
+            return sum(executor.map(self._partialProb, repeat(variable), repeat(value), repeat(variables),
+                                    bounds[:-1], bounds[1:]))
+
+    def mothers(self, var) -> list:
+        if not isinstance(self.dependencies[var], dict):
+            return list(self.dependencies[var].mothers)
+        res = []
+        for conj in self.dependencies[var]:
+            res += [m for (m, _) in conj if m not in res]
+        return res
+
+    # Factor over the mothers and the variable (the full table)
+    def factor(self, var) -> Factor:
+        mothers = self.mothers(var)
+        table = {}
+        for (conj, p) in self.dependencies[var].items():
+            vals = dict(conj)
+            row = tuple(vals[m] for m in mothers)
+            table[row + (True,)] = p
+            table[row + (False,)] = 1 - p
+        return Factor(mothers + [var], table)
+
+    # Factors whose product, summed over the auxiliary variable they
+    # may introduce (named var + suffix), is the CPT of var: noisy CPTs
+    # are not expanded
+    def factors(self, var, suffix=None) -> list:
+        deps = self.dependencies[var]
+        if isinstance(deps, dict):
+            return [self.factor(var)]
+        return deps.factors(var, str(var) + (suffix or self._auxSuffix()))
+
+    # A suffix that no variable name ends with
+    def _auxSuffix(self) -> str:
+        suffix = "'"
+        while any(str(v).endswith(suffix) for v in self.dependencies):
+            suffix += "'"
+        return suffix
+
+    # Greedy elimination ordering over the interaction graph
+    # of the given factors ('min_fill' or 'min_degree')
+    def eliminationOrder(self, variables, factors=None, heuristic='min_fill') -> list:
+        if factors is None:
+            factors = [self.factor(v) for v in self.dependencies]
+        graph = {}
+        for f in factors:
+            for v in f.variables:
+                graph.setdefault(v, set()).update(u for u in f.variables if u != v)
+
+        def cost(v):
+            neighbours = graph.get(v, set())
+            if heuristic == 'min_degree':
+                return len(neighbours)
+            return sum(1 for a in neighbours for b in neighbours if a < b and b not in graph[a])
+
+        order, remaining = [], list(variables)
+        while remaining:
+            v = min(remaining, key=cost)
+            remaining.remove(v)
+            order.append(v)
+            neighbours = graph.pop(v, set())
+            for a in neighbours:
+                graph[a].discard(v)
+                graph[a].update(neighbours - {a})
+        return order
+
+    # Distribution of a variable, given a conjunction of evidence,
+    # computed by variable elimination: { True: p, False: p }
+    def marginal(self, variable, evidence=(), heuristic='min_fill') -> dict:
+        evidence = dict(evidence)
+        # an observed variable keeps its observed value
+        if variable in evidence:
+            return {val: 1.0 if val == evidence[variable] else 0.0 for val in (True, False)}
+        (pruned, kept) = self._pruned([variable], evidence)
+        if len(pruned.dependencies) < len(self.dependencies):
+            return pruned.marginal(variable, kept, heuristic)
+        factors = []
+        suffix = self._auxSuffix()
+        for v in self.dependencies:
+            for f in self.factors(v, suffix):
+                for (e, val) in evidence.items():
+                    f = f.restrict(e, val)
+                factors.append(f)
+
+        hidden = list(dict.fromkeys(v for f in factors for v in f.variables if v != variable))
+        for v in self.eliminationOrder(hidden, factors, heuristic):
+            related = [f for f in factors if v in f.variables]
+            factors = [f for f in factors if v not in f.variables]
+            prod = related[0]
+            for f in related[1:]:
+                prod = prod.multiply(f)
+            factors.append(prod.sum_out(v))
+
+        result = Factor((), {(): 1.0})
+        for f in factors:
+            result = result.multiply(f)
+        dist = {val: result.table[(val,)] for val in (True, False)}
+        if evidence:
+            total = sum(dist.values())
+            dist = {val: p / total for (val, p) in dist.items()}
+        return dist
+
+    def conditionalProb(self, variable, value, evidence=(), heuristic='min_fill'):
+        return self.marginal(variable, evidence, heuristic)[value]
 
 # Footnote 1:
 # Default arguments are evaluated on function definition,
@@ -0,0 +1,224 @@
+# Benchmarks for the SemanticNetwork and BayesNet hot paths
+#
+#   python -m benchmarks.bench --sizes 1000 10000 --out results.json
+#   python -m benchmarks.bench --compare old.json results.json
+#
+# Each benchmark reports calls, throughput, latency percentiles and the
+# peak memory allocated by one call (measured in a separate traced run,
+# so tracing does not distort the timings).  The concurrency benchmarks
+# run the same queries from several threads over one concurrent network,
+# with and without a writer thread inserting and removing declarations.
+# The sharded benchmarks run one client thread per shard process against
+# a ShardedSemanticNetwork built from the same declarations.
+import argparse
+import json
+import platform
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from benchmarks import generators
+from profiling import percentile
+from sharded import ShardedSemanticNetwork
+from semantic_network import Association, Declaration
+
+
+MEMORY = True
+
+
+def timed(fn, args_list, latencies):
+    for args in args_list:
+        t = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t)
+
+
+def summary(name, size, latencies, elapsed) -> dict:
+    return {'benchmark': name, 'size': size, 'calls': len(latencies),
+            'throughput': len(latencies) / elapsed if elapsed else None,
+            'latency_ms': {p: 1000 * percentile(latencies, q)
+                           for (p, q) in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))}}
+
+
+def measure(name, size, fn, args_list) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    timed(fn, args_list, latencies)
+    result = summary(name, size, latencies, time.perf_counter() - start)
+    result['peak_memory_bytes'] = peak_memory(fn, *args_list[0])
+    return result
+
+
+def peak_memory(fn, *args):
+    if not MEMORY:
+        return None
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def build(name, size, fn) -> dict:
+    t = time.perf_counter()
+    res = fn()
+    elapsed = time.perf_counter() - t
+    return res, {'benchmark': name, 'size': size, 'calls': 1, 'throughput': size / elapsed,
+                 'latency_ms': {'p50': 1000 * elapsed}, 'peak_memory_bytes': peak_memory(fn)}
+
+
+def sn_benchmarks(size, calls, rnd) -> list:
+    z, report = build('sn_build', size, lambda: generators.hierarchy_sn(size, seed=size))
+    z, types, instances = z
+    results = [report]
+
+    def entities(pool):
+        return [(rnd.choice(pool),) for _ in range(calls)]
+
+    assoc = [(rnd.choice(instances), rnd.choice(generators.ASSOCS)) for _ in range(calls)]
+    upper = types[:max(1, len(types) // 8)]
+    down = [(t, a) for (t, a) in ((rnd.choice(upper), rnd.choice(generators.ASSOCS)) for _ in range(calls))
+            if z.query_down(t, a)] or [(types[0], generators.ASSOCS[0])]
+    results.append(measure('query_local', size, lambda e: z.query_local(e1=e), entities(instances)))
+    results.append(measure('query_local_scan', size, lambda u: z.query_local(user=u),
+                           [(rnd.choice(generators.USERS),) for _ in range(max(1, calls // 10))]))
+    results.append(measure('query', size, z.query, assoc))
+    results.append(measure('query_cancel', size, z.query_cancel, assoc))
+    results.append(measure('query_down', size, z.query_down, down))
+    results.append(measure('query_induce', size, z.query_induce, down))
+
+    fixture = generators.scaled_sn(size)
+    objs = fixture.list_objects()
+    results.append(measure('fixture_query', size, fixture.query, [(rnd.choice(objs), 'altura') for _ in range(calls)]))
+    return results
+
+
+# The queries are split over the reader threads; the optional writer keeps
+# inserting and removing an association (one change per millisecond) until
+# the readers finish, so the cached answers are invalidated as they go.
+def concurrency_benchmarks(size, calls, threads, rnd) -> list:
+    z, types, instances = generators.hierarchy_sn(size, seed=size, concurrent=True)
+    queries = [(rnd.choice(instances), rnd.choice(generators.ASSOCS)) for _ in range(calls)]
+    results = []
+    for n in threads:
+        for writer in (False, True):
+            z.cache_clear()
+            done = threading.Event()
+
+            def write(rnd=random.Random(size)):
+                while not done.is_set():
+                    did = z.insert(Declaration('bench', Association(rnd.choice(types), 'gosta', 'bench')))
+                    z.remove(did)
+                    time.sleep(0.001)
+
+            latencies = []
+            readers = [threading.Thread(target=timed, args=(z.query, queries[i::n], latencies)) for i in range(n)]
+            writers = [threading.Thread(target=write)] if writer else []
+            start = time.perf_counter()
+            for t in readers + writers:
+                t.start()
+            for t in readers:
+                t.join()
+            elapsed = time.perf_counter() - start
+            done.set()
+            for t in writers:
+                t.join()
+            result = summary('query_threads%d%s' % (n, '_writer' if writer else ''), size, latencies, elapsed)
+            result.update(threads=n, peak_memory_bytes=None)
+            results.append(result)
+    return results
+
+
+def sharded_benchmarks(size, calls, shard_counts, rnd) -> list:
+    z, types, instances = generators.hierarchy_sn(size, seed=size)
+    workloads = {'query_local': [(None, rnd.choice(instances)) for _ in range(calls)],
+                 'query': [(rnd.choice(instances), rnd.choice(generators.ASSOCS)) for _ in range(calls)]}
+    results = []
+    for n in shard_counts:
+        with ShardedSemanticNetwork(z.declarations, shards=n) as sharded:
+            for (name, queries) in workloads.items():
+                fn = getattr(sharded, name)
+                latencies = []
+                clients = [threading.Thread(target=timed, args=(fn, queries[i::n], latencies)) for i in range(n)]
+                start = time.perf_counter()
+                for t in clients:
+                    t.start()
+                for t in clients:
+                    t.join()
+                result = summary('sharded_%s_%d' % (name, n), size, latencies, time.perf_counter() - start)
+                result.update(shards=n, peak_memory_bytes=None)
+                results.append(result)
+    return results
+
+
+def bn_benchmarks(size, calls, rnd, max_enum) -> list:
+    results = []
+    for (name, bn) in (('random', generators.random_bn(size, seed=size)), ('fixture', generators.scaled_bn(size))):
+        variables = list(bn.dependencies)
+        conjs = [([(v, rnd.random() < 0.5) for v in variables],) for _ in range(calls)]
+        results.append(measure('jointProb_' + name, size, bn.jointProb, conjs))
+        if size <= max_enum:
+            queries = [(rnd.choice(variables), True) for _ in range(max(1, calls // 100))]
+            results.append(measure('individualProb_' + name, size, bn.individualProb, queries))
+    return results
+
+
+def compare(old_path, new_path):
+    def load(path):
+        with open(path) as f:
+            return {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+
+    old, new = load(old_path), load(new_path)
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key]['throughput'] / old[key]['throughput']
+        print('%-24s %10d  x%.2f%s' % (key[0], key[1], ratio, '  REGRESSION' if ratio < 0.9 else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='number of declarations of the semantic networks')
+    parser.add_argument('--bn-sizes', type=int, nargs='+', default=[10, 15, 50, 200],
+                        help='number of variables of the Bayesian networks')
+    parser.add_argument('--max-enum', type=int, default=15,
+                        help='largest network on which individualProb is timed')
+    parser.add_argument('--calls', type=int, default=1000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4],
+                        help='reader threads of the concurrency benchmarks')
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2],
+                        help='shard processes of the sharded benchmarks')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced peak memory runs')
+    parser.add_argument('--out', default='-')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    global MEMORY
+    MEMORY = not args.no_memory
+    rnd = random.Random(args.seed)
+    results = []
+    for size in args.sizes:
+        results += sn_benchmarks(size, args.calls, rnd)
+        results += concurrency_benchmarks(size, args.calls, args.threads, rnd)
+        results += sharded_benchmarks(size, args.calls, args.shards, rnd)
+    for size in args.bn_sizes:
+        results += bn_benchmarks(size, args.calls, rnd, args.max_enum)
+
+    report = {'meta': {'python': sys.version, 'platform': platform.platform(), 'time': time.time(),
+                       'args': vars(args)},
+              'results': results}
+    if args.out == '-':
+        json.dump(report, sys.stdout, indent=1)
+    else:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
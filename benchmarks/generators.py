@@ -0,0 +1,103 @@
+# Synthetic networks for the benchmarks
+#
+# Semantic networks are built either by replicating the sn_example
+# fixture with renamed entities, or as a type tree of a given depth and
+# branching with instances and associations at every level.  Bayesian
+# networks replicate the sof2018h fixture, or are random DAGs.
+import contextlib
+import io
+import random
+
+from semantic_network import *
+from bayes_net import BayesNet
+
+USERS = ['descartes', 'darwin', 'simao', 'simoes', 'damasio']
+ASSOCS = ['professor', 'altura', 'peso', 'gosta', 'mamar']
+
+
+def _fixture(module):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return __import__(module)
+
+
+# Copies of the sn_example declarations, with entity names suffixed by
+# the copy number, until n declarations are generated
+def scaled_sn(n) -> SemanticNetwork:
+    base = _fixture('sn_example').z.declarations
+    z = SemanticNetwork()
+    for i in range(n):
+        d = base[i % len(base)]
+        k = '_%d' % (i // len(base))
+        r = d.relation
+        e2 = r.entity2 + k if isinstance(r.entity2, str) else r.entity2
+        if isinstance(r, (Member, Subtype)):
+            z.insert(Declaration(d.user, type(r)(r.entity1 + k, e2)))
+        else:
+            z.insert(Declaration(d.user, type(r)(r.entity1 + k, r.name, e2)))
+    return z
+
+
+# Type tree with the given depth and branching factor; the remaining
+# declarations are instances of the leaves and associations spread
+# over types and instances.  Returns the network, types and instances.
+def hierarchy_sn(n, depth=6, width=4, seed=0, concurrent=False):
+    rnd = random.Random(seed)
+    z = SemanticNetwork(concurrent=concurrent)
+    types, level = ['t'], ['t']
+    for d in range(depth):
+        nxt = []
+        for t in level:
+            for w in range(width):
+                if len(z) >= n // 4:
+                    break
+                sub = '%s.%d' % (t, w)
+                z.insert(Declaration(rnd.choice(USERS), Subtype(sub, t)))
+                nxt.append(sub)
+        types += nxt
+        level = nxt or level
+
+    instances = []
+    while len(z) < n:
+        if rnd.random() < 0.3 or not instances:
+            obj = 'o%d' % len(instances)
+            z.insert(Declaration(rnd.choice(USERS), Member(obj, rnd.choice(level))))
+            instances.append(obj)
+        else:
+            e1 = rnd.choice(types) if rnd.random() < 0.5 else rnd.choice(instances)
+            name = rnd.choice(ASSOCS)
+            value = round(rnd.uniform(1, 2), 1) if name in ('altura', 'peso') else rnd.choice(ASSOCS)
+            z.insert(Declaration(rnd.choice(USERS), Association(e1, name, value)))
+    return z, types, instances
+
+
+# Copies of the sof2018h network, each copy's root depending on the
+# previous copy, truncated to n variables
+def scaled_bn(n) -> BayesNet:
+    base = _fixture('sof2018h').bn.dependencies
+    bn = BayesNet()
+    k = 0
+    while len(bn.dependencies) < n:
+        for (var, cpt) in base.items():
+            if len(bn.dependencies) >= n:
+                break
+            for (mothers, p) in cpt.items():
+                mothers = [(m + '_%d' % k, v) for (m, v) in mothers]
+                if not mothers and k > 0 and var == 'sc':
+                    bn.add(var + '_%d' % k, [('fr_%d' % (k - 1), True)], p)
+                    bn.add(var + '_%d' % k, [('fr_%d' % (k - 1), False)], p / 2)
+                else:
+                    bn.add(var + '_%d' % k, mothers, p)
+        k += 1
+    return bn
+
+
+def random_bn(n, max_parents=3, seed=0) -> BayesNet:
+    rnd = random.Random(seed)
+    bn = BayesNet()
+    names = ['v%d' % i for i in range(n)]
+    for (i, var) in enumerate(names):
+        mothers = rnd.sample(names[:i], min(i, rnd.randint(0, max_parents)))
+        for k in range(2 ** len(mothers)):
+            conj = [(m, bool(k >> j & 1)) for (j, m) in enumerate(mothers)]
+            bn.add(var, conj, round(rnd.uniform(0.01, 0.99), 3))
+    return bn
@@ -0,0 +1,196 @@
+# Approximate inference on a BayesNet by sampling
+#
+# Three estimators of P(variable=value | evidence):
+#   - 'rejection': forward (ancestral) sampling, discarding the samples
+#     that contradict the evidence
+#   - 'likelihood': likelihood weighting, with evidence variables fixed
+#     and each sample weighted by the probability of the evidence
+#   - 'gibbs': Gibbs sampling over the Markov blankets of the
+#     non-evidence variables
+# Samples are drawn in batches, one column (list) per variable.  Each
+# batch contributes a pair (sum of weights of matching samples, sum of
+# weights); the estimate is the ratio of the totals and its standard
+# error is the batch-means ratio estimator error, which also accounts
+# for the autocorrelation of Gibbs chains.  Independent chains can run
+# in a ProcessPoolExecutor; given a seed, results do not depend on the
+# number of workers.
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+Estimate = namedtuple('Estimate', ['value', 'stderr', 'low', 'high', 'samples'])
+
+
+def topological_order(bn) -> list:
+    order, done = [], set()
+    pending = list(bn.dependencies)
+    while pending:
+        ready = [v for v in pending if all(m in done for m in bn.mothers(v))]
+        if not ready:
+            raise ValueError("the network has a cycle")
+        for v in ready:
+            order.append(v)
+            done.add(v)
+        pending = [v for v in pending if v not in done]
+    return order
+
+
+# Parameterised CPT (see cpt.py) looked up like the tables below,
+# evaluated on each access instead of being expanded
+class _Evaluated:
+
+    def __init__(self, cpt, mothers):
+        self.cpt, self.mothers = cpt, mothers
+
+    def __getitem__(self, values) -> float:
+        return self.cpt.prob(dict(zip(self.mothers, values)))
+
+
+# CPTs as { var: (mothers, { mother values: P(var=True) }) }
+def cpt_tables(bn) -> dict:
+    tables = {}
+    for var in bn.dependencies:
+        mothers = bn.mothers(var)
+        deps = bn.dependencies[var]
+        if not isinstance(deps, dict):
+            tables[var] = (mothers, _Evaluated(deps, mothers))
+            continue
+        tables[var] = (mothers, {tuple(dict(conj)[m] for m in mothers): p
+                                 for (conj, p) in deps.items()})
+    return tables
+
+
+class Chain:
+
+    def __init__(self, bn, variable, value, evidence, method, seed, burn_in=100):
+        if method not in ('rejection', 'likelihood', 'gibbs'):
+            raise ValueError("unknown sampling method " + str(method))
+        self.order = topological_order(bn)
+        self.tables = cpt_tables(bn)
+        self.variable, self.value = variable, value
+        self.evidence = dict(evidence)
+        self.method = method
+        self.rng = random.Random(seed)
+        self.state = None
+        self.burn_in = burn_in
+        if method == 'gibbs':
+            children = {v: [] for v in self.order}
+            for v in self.order:
+                for m in self.tables[v][0]:
+                    children[m].append(v)
+            self.children = children
+            self.free = [v for v in self.order if v not in self.evidence]
+
+    def _prob(self, var, values) -> float:
+        mothers, table = self.tables[var]
+        return table[tuple(values[m] for m in mothers)]
+
+    def _forward(self, n, fix_evidence):
+        rnd = self.rng.random
+        columns, weights = {}, [1.0] * n
+        for var in self.order:
+            mothers, table = self.tables[var]
+            probs = [table[k] for k in zip(*(columns[m] for m in mothers))] if mothers else [table[()]] * n
+            if fix_evidence and var in self.evidence:
+                val = self.evidence[var]
+                columns[var] = [val] * n
+                weights = [w * (p if val else 1 - p) for (w, p) in zip(weights, probs)]
+            else:
+                columns[var] = [rnd() < p for p in probs]
+        return columns, weights
+
+    def _gibbs_step(self):
+        state, rnd = self.state, self.rng.random
+        for var in self.free:
+            weight = {}
+            for val in (True, False):
+                state[var] = val
+                p = self._prob(var, state)
+                w = p if val else 1 - p
+                for c in self.children[var]:
+                    pc = self._prob(c, state)
+                    w *= pc if state[c] else 1 - pc
+                weight[val] = w
+            total = weight[True] + weight[False]
+            state[var] = rnd() * total < weight[True] if total > 0 else state[var]
+
+    # Returns the (matching weight, total weight) pair of one batch of n samples
+    def batch(self, n) -> tuple:
+        if self.method == 'rejection':
+            columns, _ = self._forward(n, False)
+            accepted = [all(columns[e][i] == v for (e, v) in self.evidence.items()) for i in range(n)]
+            hits = sum(1 for (ok, x) in zip(accepted, columns[self.variable]) if ok and x == self.value)
+            return float(hits), float(sum(accepted))
+
+        if self.method == 'likelihood':
+            columns, weights = self._forward(n, True)
+            return sum(w for (w, x) in zip(weights, columns[self.variable]) if x == self.value), sum(weights)
+
+        if self.method == 'gibbs':
+            if self.state is None:
+                columns, _ = self._forward(1, True)
+                self.state = {v: columns[v][0] for v in self.order}
+                for _ in range(self.burn_in):
+                    self._gibbs_step()
+            hits = 0
+            for _ in range(n):
+                self._gibbs_step()
+                hits += self.state[self.variable] == self.value
+            return float(hits), float(n)
+
+
+def _run(chain, batches, batch_size):
+    return chain, [chain.batch(batch_size) for _ in range(batches)]
+
+
+def _summary(batches, confidence, samples) -> Estimate:
+    num = sum(b[0] for b in batches)
+    den = sum(b[1] for b in batches)
+    if den == 0:
+        return Estimate(float('nan'), float('inf'), 0.0, 1.0, samples)
+    p = num / den
+    k = len(batches)
+    mean_den = den / k
+    var = sum((n - p * d) ** 2 for (n, d) in batches) / (k * (k - 1)) / mean_den ** 2 if k > 1 else float('inf')
+    stderr = var ** 0.5
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return Estimate(p, stderr, max(0.0, p - z * stderr), min(1.0, p + z * stderr), samples)
+
+
+# Estimates P(variable=value | evidence), drawing at most `samples`
+# samples or stopping earlier once the standard error reaches `stderr`
+def estimate(bn, variable, value, evidence=(), method='likelihood', samples=10000, stderr=None,
+             batch_size=500, chains=4, workers=None, seed=None, confidence=0.95, burn_in=100) -> Estimate:
+    base = random.Random(seed)
+    pool = [Chain(bn, variable, value, evidence, method, base.getrandbits(64), burn_in) for _ in range(chains)]
+    # each round runs every chain for a few batches
+    per_round = max(1, min(10, samples // (batch_size * chains)))
+    batches, drawn = [], 0
+    executor = ProcessPoolExecutor(workers) if workers else None
+    try:
+        while drawn < samples:
+            remaining = samples - drawn
+            if remaining >= batch_size * chains:
+                rounds = min(per_round, remaining // (batch_size * chains))
+                sizes = [batch_size] * chains
+            else:
+                # the last round shares what is left of the budget
+                rounds = 1
+                sizes = [remaining // chains + (i < remaining % chains) for i in range(chains)]
+            active = [i for i in range(chains) if sizes[i]]
+            if executor is None:
+                results = [_run(pool[i], rounds, sizes[i]) for i in active]
+            else:
+                results = list(executor.map(_run, [pool[i] for i in active], [rounds] * len(active),
+                                            [sizes[i] for i in active]))
+            for (i, (c, b)) in zip(active, results):
+                pool[i] = c
+                batches += b
+            drawn += rounds * sum(sizes)
+            if stderr is not None and _summary(batches, confidence, drawn).stderr <= stderr:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return _summary(batches, confidence, drawn)
@@ -0,0 +1,67 @@
+# Compiled (dense NumPy) form of a BayesNet
+#
+# Each variable's CPT becomes a dense array indexed by the bits of its
+# mothers' values (first mother = most significant bit, True = 1).
+# All tables are concatenated, so that the probabilities of a batch of
+# full assignments are obtained with one matrix product (to compute
+# the row of each CPT), one gather and a sum of logarithms.
+# Parameterised CPTs (cpt.py) are expanded into dense arrays too.
+import numpy as np
+
+
+class CompiledBayesNet:
+
+    def __init__(self, bn):
+        self.variables = list(bn.dependencies)
+        self.index = {v: i for (i, v) in enumerate(self.variables)}
+        n = len(self.variables)
+
+        # weights[m, v] is the weight of mother m's bit in v's CPT row
+        self.weights = np.zeros((n, n), dtype=np.int64)
+        self.offsets = np.zeros(n, dtype=np.int64)
+        tables = []
+        offset = 0
+        for (v, var) in enumerate(self.variables):
+            mothers = bn.mothers(var)
+            k = len(mothers)
+            for (i, m) in enumerate(mothers):
+                self.weights[self.index[m], v] = 1 << (k - 1 - i)
+            table = np.full(1 << k, np.nan)
+            for (conj, p) in bn.dependencies[var].items():
+                vals = dict(conj)
+                table[sum(1 << (k - 1 - i) for (i, m) in enumerate(mothers) if vals[m])] = p
+            if np.isnan(table).any():
+                raise ValueError("incomplete CPT for variable " + str(var))
+            tables.append(table)
+            self.offsets[v] = offset
+            offset += len(table)
+
+        probs = np.concatenate(tables) if tables else np.zeros(0)
+        with np.errstate(divide='ignore'):
+            self.log_true = np.log(probs)
+            self.log_false = np.log1p(-probs)
+
+    # Converts a list of full conjunctions into a boolean matrix
+    # with one column per variable (in self.variables order)
+    def assignments(self, conjunctions):
+        res = np.zeros((len(conjunctions), len(self.variables)), dtype=bool)
+        for (row, conj) in enumerate(conjunctions):
+            vals = dict(conj)
+            if len(vals) != len(self.variables):
+                raise ValueError("conjunction must assign every variable")
+            res[row] = [vals[v] for v in self.variables]
+        return res
+
+    def logJointProb(self, assignments):
+        x = np.asarray(assignments, dtype=bool)
+        if x.ndim == 1:
+            x = x[np.newaxis, :]
+        rows = x.astype(np.int64) @ self.weights + self.offsets
+        return np.where(x, self.log_true[rows], self.log_false[rows]).sum(axis=1)
+
+    # Joint probabilities of a batch of full assignments, either as
+    # a boolean matrix or as a list of conjunctions
+    def jointProb(self, assignments):
+        if not isinstance(assignments, np.ndarray):
+            assignments = self.assignments(assignments)
+        return np.exp(self.logJointProb(assignments))
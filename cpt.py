@@ -0,0 +1,129 @@
+# Parameterised CPTs for BayesNet variables with many mothers
+#
+# Instead of the dictionary { conjunction: P(var=True) } with one entry
+# per configuration of the mothers, a variable can be given an object
+# whose size is linear in the number of mothers:
+#
+#   bn.addCpt('alarm', NoisyOr({'burglary': 0.9, 'earthquake': 0.3}, leak=0.01))
+#
+#   - NoisyOr: each mother that is True causes var=True independently
+#     with its own probability (noisy-MAX on boolean variables is the
+#     same model); the leak is the probability of var=True when every
+#     mother is False
+#   - NoisyAnd: each mother that is False prevents var=True independently
+#     with its own probability; the leak is P(var=True) when every
+#     mother is True
+#   - Rules: ordered (conditions, probability) pairs, where the first
+#     rule whose conditions hold gives P(var=True); a decision tree is
+#     the rule set of its leaves
+#
+# jointProb and sampling evaluate prob() directly.  For variable
+# elimination the noisy CPTs are split (Diez and Galan) into factors of
+# two or three variables through an auxiliary variable that is summed
+# out like any other; the other CPTs become one factor over the family.
+import copy
+from itertools import product
+
+from bayes_net import Factor
+
+
+class CPT:
+
+    def __init__(self, mothers):
+        self.mothers = list(mothers)
+
+    # P(var=True) given the values of the mothers ({ mother: value })
+    def prob(self, values) -> float:
+        raise NotImplementedError
+
+    # The same CPT without the mothers with the given values
+    def restrict(self, values):
+        raise NotImplementedError
+
+    # Full table, as in BayesNet.dependencies (2**len(mothers) entries)
+    def items(self):
+        for vals in product((True, False), repeat=len(self.mothers)):
+            yield frozenset(zip(self.mothers, vals)), self.prob(dict(zip(self.mothers, vals)))
+
+    def factors(self, var, aux) -> list:
+        table = {}
+        for (conj, p) in self.items():
+            row = tuple(dict(conj)[m] for m in self.mothers)
+            table[row + (True,)] = p
+            table[row + (False,)] = 1 - p
+        return [Factor(self.mothers + [var], table)]
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.__dict__)
+
+
+# P(var=base) = scale * product of (1 - p) over the mothers whose value
+# is `active`
+class _Noisy(CPT):
+    base = active = None
+
+    def __init__(self, causes, scale):
+        super().__init__(causes)
+        self.causes = dict(causes)
+        self.scale = scale
+
+    def prob(self, values) -> float:
+        q = self.scale
+        for (m, p) in self.causes.items():
+            if values[m] == self.active:
+                q *= 1 - p
+        return q if self.base else 1 - q
+
+    def restrict(self, values):
+        res = copy.copy(self)
+        res.causes = {m: p for (m, p) in self.causes.items() if m not in values}
+        res.mothers = list(res.causes)
+        for (m, p) in self.causes.items():
+            if m in values and values[m] == self.active:
+                res.scale *= 1 - p
+        return res
+
+    # sum over aux of h(var, aux) * g0(aux) * product of g_m(m, aux),
+    # where the aux=base term is P(var=base) and the other one adds
+    # 1 to P(var=not base)
+    def factors(self, var, aux) -> list:
+        (b, a) = (self.base, self.active)
+        res = [Factor((var, aux), {(b, b): 1.0, (b, not b): 0.0, (not b, b): -1.0, (not b, not b): 1.0}),
+               Factor((aux,), {(b,): self.scale, (not b,): 1.0})]
+        for (m, p) in self.causes.items():
+            res.append(Factor((m, aux), {(a, b): 1 - p, (not a, b): 1.0, (a, not b): 1.0, (not a, not b): 1.0}))
+        return res
+
+
+class NoisyOr(_Noisy):
+    base, active = False, True
+
+    def __init__(self, causes, leak=0.0):
+        super().__init__(causes, 1 - leak)
+
+
+class NoisyAnd(_Noisy):
+    base, active = True, False
+
+    def __init__(self, causes, leak=1.0):
+        super().__init__(causes, leak)
+
+
+class Rules(CPT):
+
+    def __init__(self, rules, default):
+        self.rules = [(tuple(conditions), p) for (conditions, p) in rules]
+        self.default = default
+        super().__init__(dict.fromkeys(m for (conditions, _) in self.rules for (m, _) in conditions))
+
+    def prob(self, values) -> float:
+        for (conditions, p) in self.rules:
+            if all(values[m] == val for (m, val) in conditions):
+                return p
+        return self.default
+
+    def restrict(self, values):
+        rules = [([(m, val) for (m, val) in conditions if m not in values], p)
+                 for (conditions, p) in self.rules
+                 if all(values[m] == val for (m, val) in conditions if m in values)]
+        return Rules(rules, self.default)
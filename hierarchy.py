@@ -0,0 +1,158 @@
+# Hierarquia de tipos
+# -- grafo das relacoes Member/Subtype de uma rede semantica,
+#    com o fecho transitivo mantido incrementalmente
+#
+# Para cada entidade guarda-se, para cada um dos seus antecessores,
+# a distancia minima ate ele e o primeiro passo do caminho mais curto;
+# assim, testar se um tipo e antecessor de outro e O(1) e o caminho
+# mais curto reconstroi-se em tempo proporcional ao seu comprimento.
+#
+# Os pais (e os filhos) de cada entidade estao pela ordem da declaracao
+# viva mais antiga de cada aresta (o menor identificador), a mesma ordem
+# de uma hierarquia reconstruida a partir das declaracoes restantes.
+# Sem identificadores, as declaracoes sao numeradas pela ordem de insercao.
+#
+import itertools
+
+
+class TypeHierarchy:
+    def __init__(self):
+        self.parents = {}  # entidade -> {pai: numero de declaracoes}
+        self.children = {}  # entidade -> {filho: numero de declaracoes}
+        self.up = {}  # entidade -> {antecessor: (distancia, primeiro passo)}
+        self.down = {}  # entidade -> {descendentes}
+        self.ids = {}  # (sub, sup) -> {identificador de cada declaracao}
+        self.counter = itertools.count()
+
+    def add_edge(self, sub, sup, did=None):
+        if self._count(sub, sup, did):
+            self._link(sub, sup)
+
+    # regista uma declaracao da aresta; devolve True se a aresta e nova
+    def _count(self, sub, sup, did) -> bool:
+        did = next(self.counter) if did is None else did
+        ids = self.ids.setdefault((sub, sup), {})
+        first = min(ids, default=None)
+        ids[did] = None
+        for (index, a, b, key) in self._sides(sub, sup):
+            edges = index.setdefault(a, {})
+            last = next(reversed(edges), None)
+            edges[b] = edges.get(b, 0) + 1
+            if first is not None and did < first or \
+                    edges[b] == 1 and last is not None and key(last) > did:
+                index[a] = dict(sorted(edges.items(), key=lambda item: key(item[0])))
+        return first is None
+
+    # os pais de sub e os filhos de sup, com a primeira declaracao de cada um
+    def _sides(self, sub, sup):
+        return ((self.parents, sub, sup, lambda p: min(self.ids[(sub, p)])),
+                (self.children, sup, sub, lambda c: min(self.ids[(c, sup)])))
+
+    # atualiza o fecho transitivo com uma nova aresta sub -> sup
+    def _link(self, sub, sup):
+        lower = [(sub, 0, sup)] + [(x, self.up[x][sub][0], self.up[x][sub][1]) for x in self.down.get(sub, ())]
+        upper = [(sup, 0)] + [(y, d) for (y, (d, _)) in self.up.get(sup, {}).items()]
+
+        for (x, dist_x, hop) in lower:
+            ancestors = self.up.setdefault(x, {})
+            for (y, dist_y) in upper:
+                if y == x:
+                    continue
+                dist = dist_x + 1 + dist_y
+                current = ancestors.get(y)
+                if current is None:
+                    ancestors[y] = (dist, hop)
+                    self.down.setdefault(y, set()).add(x)
+                elif dist < current[0]:
+                    ancestors[y] = (dist, hop)
+
+    # Insere varias arestas de uma vez, recalculando numa unica passagem
+    # em ordem topologica o fecho das entidades abaixo das arestas novas
+    # -- cada aresta e (sub, sup) ou (sub, sup, identificador)
+    def add_edges(self, edges):
+        nodes = set()
+        for (sub, sup, *did) in edges:
+            if self._count(sub, sup, did[0] if did else None) and sub not in nodes:
+                nodes.add(sub)
+                nodes.update(self.down.get(sub, ()))
+        if nodes:
+            self._recompute(nodes)
+
+    # Remove uma declaracao da aresta (sem identificador, a mais recente);
+    # quando deixa de haver declaracoes, so e recalculado o fecho das
+    # entidades abaixo dela
+    def remove_edge(self, sub, sup, did=None):
+        ids = self.ids[(sub, sup)]
+        did = max(ids) if did is None else did
+        del ids[did]
+        self.parents[sub][sup] -= 1
+        self.children[sup][sub] -= 1
+        if self.parents[sub][sup]:
+            # a aresta passa para a posicao da declaracao seguinte
+            if did < min(ids):
+                for (index, a, _, key) in self._sides(sub, sup):
+                    index[a] = dict(sorted(index[a].items(), key=lambda item: key(item[0])))
+            return
+        del self.ids[(sub, sup)]
+        del self.parents[sub][sup], self.children[sup][sub]
+        for (d, x) in ((self.parents, sub), (self.children, sup)):
+            if not d[x]:
+                del d[x]
+        self._recompute({sub} | self.down.get(sub, set()))
+
+    # Recalcula os antecessores das entidades dadas (e os descendentes
+    # correspondentes), processando-as em ordem topologica a partir dos
+    # antecessores ja conhecidos das restantes
+    def _recompute(self, nodes):
+        for x in nodes:
+            for y in self.up.pop(x, {}):
+                self.down[y].discard(x)
+                if not self.down[y]:
+                    del self.down[y]
+
+        pending = {x: sum(1 for p in self.parents.get(x, ()) if p in nodes) for x in nodes}
+        ready = [x for (x, n) in pending.items() if n == 0]
+        while ready:
+            x = ready.pop()
+            ancestors = {}
+            for p in self.parents.get(x, ()):
+                candidates = [(p, 0)] + [(y, d) for (y, (d, _)) in self.up.get(p, {}).items()]
+                for (y, dist) in candidates:
+                    current = ancestors.get(y)
+                    if y != x and (current is None or dist + 1 < current[0]):
+                        ancestors[y] = (dist + 1, p)
+            if ancestors:
+                self.up[x] = ancestors
+            for y in ancestors:
+                self.down.setdefault(y, set()).add(x)
+            for c in self.children.get(x, ()):
+                if c in pending:
+                    pending[c] -= 1
+                    if pending[c] == 0:
+                        ready.append(c)
+
+        # arestas em ciclos ficam de fora da ordem topologica
+        cyclic = [(x, p) for (x, n) in pending.items() if n > 0 for p in self.parents[x]]
+        for (sub, sup) in cyclic:
+            self._link(sub, sup)
+
+    def is_ancestor(self, ancestor, entity) -> bool:
+        return ancestor in self.up.get(entity, ())
+
+    def ancestors(self, entity) -> set:
+        return set(self.up.get(entity, ()))
+
+    def descendants(self, entity) -> set:
+        return set(self.down.get(entity, ()))
+
+    def path(self, entity, ancestor) -> list | None:
+        if entity == ancestor:
+            return [entity]
+        if not self.is_ancestor(ancestor, entity):
+            return None
+
+        path = [entity]
+        while entity != ancestor:
+            entity = self.up[entity][ancestor][1]
+            path.append(entity)
+        return path
@@ -0,0 +1,145 @@
+# Junction tree compilation of a BayesNet
+#
+# The moral graph is triangulated with the network's elimination
+# ordering heuristic; the maximal cliques are linked by a maximum
+# weight spanning tree over separator sizes, and calibrated with
+# Hugin message passing (collect to a root, then distribute).
+# After calibration every clique holds the joint of its variables
+# with the evidence, so all marginals come from one pass; new
+# evidence is absorbed into one clique and distributed from there.
+from bayes_net import Factor
+
+
+class JunctionTree:
+
+    def __init__(self, bn, heuristic='min_fill'):
+        self.bn = bn
+        factors = [bn.factor(v) for v in bn.dependencies]
+        order = bn.eliminationOrder(list(bn.dependencies), factors, heuristic)
+        self.cliques = self._cliques(factors, order)
+
+        # maximum spanning tree (Kruskal) weighted by separator size
+        candidates = sorted(((len(a & b), i, j) for (i, a) in enumerate(self.cliques)
+                             for (j, b) in enumerate(self.cliques) if i < j), reverse=True)
+        component = list(range(len(self.cliques)))
+
+        def find(i):
+            while component[i] != i:
+                component[i] = component[component[i]]
+                i = component[i]
+            return i
+
+        self.neighbours = {i: [] for i in range(len(self.cliques))}
+        for (_, i, j) in candidates:
+            if find(i) != find(j):
+                component[find(i)] = find(j)
+                self.neighbours[i].append(j)
+                self.neighbours[j].append(i)
+
+        self.home = {}
+        for f in factors:
+            family = set(f.variables)
+            self.home[f.variables[-1]] = min((i for (i, c) in enumerate(self.cliques) if family <= c),
+                                             key=lambda i: len(self.cliques[i]))
+        self.factors = factors
+        self.reset()
+
+    @staticmethod
+    def _cliques(factors, order) -> list:
+        graph = {}
+        for f in factors:
+            for v in f.variables:
+                graph.setdefault(v, set()).update(u for u in f.variables if u != v)
+
+        cliques = []
+        for v in order:
+            neighbours = graph.pop(v)
+            clique = neighbours | {v}
+            if not any(clique <= c for c in cliques):
+                cliques.append(clique)
+            for a in neighbours:
+                graph[a].discard(v)
+                graph[a].update(neighbours - {a})
+        return cliques
+
+    @staticmethod
+    def _ones(variables) -> Factor:
+        res = Factor((), {(): 1.0})
+        for v in sorted(variables):
+            res = res.multiply(Factor((v,), {(True,): 1.0, (False,): 1.0}))
+        return res
+
+    # Discards all evidence and recalibrates the tree
+    def reset(self):
+        self.evidence = {}
+        self.potentials = [self._ones(c) for c in self.cliques]
+        for f in self.factors:
+            i = self.home[f.variables[-1]]
+            self.potentials[i] = self.potentials[i].multiply(f)
+        self.separators = {(i, j): self._ones(self.cliques[i] & self.cliques[j])
+                           for i in self.neighbours for j in self.neighbours[i] if i < j}
+        self.calibrate()
+
+    def _pass(self, i, j):
+        key = (min(i, j), max(i, j))
+        message = self.potentials[i].project(self.cliques[i] & self.cliques[j])
+        self.potentials[j] = self.potentials[j].multiply(message.divide(self.separators[key]))
+        self.separators[key] = message
+
+    # Cliques reachable from i, in breadth-first order, with their parents
+    def _tree_order(self, i) -> list:
+        order, seen = [(i, None)], {i}
+        for (k, _) in order:
+            for j in self.neighbours[k]:
+                if j not in seen:
+                    seen.add(j)
+                    order.append((j, k))
+        return order
+
+    def _distribute(self, i):
+        for (j, parent) in self._tree_order(i)[1:]:
+            self._pass(parent, j)
+
+    def calibrate(self):
+        self.roots, seen = [], set()
+        for i in range(len(self.cliques)):
+            if i not in seen:
+                order = self._tree_order(i)
+                seen.update(j for (j, _) in order)
+                self.roots.append(i)
+                for (j, parent) in reversed(order[1:]):
+                    self._pass(j, parent)
+                self._distribute(i)
+
+    # Absorbs evidence var=value into a clique and distributes it,
+    # without recompiling; a contradicting value forces a reset
+    def setEvidence(self, var, value):
+        if self.evidence.get(var, value) != value:
+            evidence = dict(self.evidence)
+            evidence[var] = value
+            self.reset()
+            for (v, val) in evidence.items():
+                self.setEvidence(v, val)
+            return
+
+        self.evidence[var] = value
+        i = self.home[var]
+        pot = self.potentials[i]
+        k = pot.variables.index(var)
+        pot.table = {vals: (p if vals[k] == value else 0.0) for (vals, p) in pot.table.items()}
+        self._distribute(i)
+
+    # Probability of the evidence entered so far
+    def evidenceProb(self) -> float:
+        prob = 1.0
+        for i in self.roots:
+            prob *= sum(self.potentials[i].table.values())
+        return prob
+
+    def marginal(self, var) -> dict:
+        f = self.potentials[self.home[var]].project({var})
+        total = sum(f.table.values())
+        return {val: f.table[(val,)] / total for val in (True, False)}
+
+    def marginals(self) -> dict:
+        return {var: self.marginal(var) for var in self.bn.dependencies}
@@ -0,0 +1,129 @@
+# Consultas por padroes sobre uma rede semantica
+# -- cada padrao e um tuplo (user, e1, rel, e2, rel_type) em que cada campo
+#    pode ser uma constante, uma variavel ('?x') ou None (qualquer valor);
+#    a resposta sao as atribuicoes de valores as variaveis que satisfazem
+#    todos os padroes, nas declaracoes locais da rede (como query_local)
+#
+# Exemplo: membros de homem que sao professores de algo de que filosofo gosta
+#   z.match([(None, '?x', None, 'homem', Member),
+#            (None, '?x', 'professor', '?y'),
+#            (None, 'filosofo', 'gosta', '?y')])
+#
+# O planeador ordena os padroes de forma gulosa: primeiro o de menor
+# cardinalidade estimada (pelos indices), depois sempre um padrao ligado
+# aos ja escolhidos, o que menos linhas deve produzir, dividindo a sua
+# cardinalidade pelo numero de valores distintos de cada campo ja ligado.
+# Cada passo e uma juncao por hash nas variaveis partilhadas; quando os
+# valores a juntar sao poucos, so as declaracoes com esses valores sao
+# lidas (pelo indice do campo), em vez de todas as do padrao.
+#
+from collections import namedtuple
+
+from semantic_network import RELATION_TYPES
+
+Pattern = namedtuple('Pattern', ['user', 'e1', 'rel', 'e2', 'rel_type'], defaults=(None,) * 5)
+
+
+def is_var(x) -> bool:
+    return isinstance(x, str) and x.startswith('?')
+
+
+def variables(p) -> list:
+    return list(dict.fromkeys(x for x in p if is_var(x)))
+
+
+def _pattern(p) -> Pattern:
+    p = Pattern(*p)
+    if isinstance(p.rel_type, str) and not is_var(p.rel_type):
+        p = p._replace(rel_type=RELATION_TYPES[p.rel_type])
+    return p
+
+
+def _values(d) -> tuple:
+    return (d.user, d.relation.entity1, d.relation.name, d.relation.entity2, type(d.relation))
+
+
+def _constants(p) -> list:
+    return [None if is_var(x) else x for x in p]
+
+
+def _indexes(sn) -> list:
+    return [sn.by_user, sn.by_entity1, sn.by_name, sn.by_entity2]
+
+
+def cardinality(sn, p) -> int:
+    sizes = [len(index.get(key, ())) for (index, key) in zip(_indexes(sn), _constants(p)) if key is not None]
+    rel_type = _constants(p)[4]
+    if rel_type is not None:
+        sizes.append(sum(len(ids) for (cls, ids) in sn.by_class.items() if issubclass(cls, rel_type)))
+    return min(sizes, default=len(sn.store))
+
+
+# numero de valores distintos de um campo (1 se o indice nao o souber dizer)
+def distinct(sn, field) -> int:
+    try:
+        return max(1, len((_indexes(sn) + [sn.by_class])[field]))
+    except TypeError:
+        return 1
+
+
+def plan(sn, patterns) -> list:
+    remaining, bound, steps = [_pattern(p) for p in patterns], set(), []
+
+    def cost(p):
+        estimate = cardinality(sn, p)
+        for (field, x) in enumerate(p):
+            if is_var(x) and x in bound:
+                estimate /= distinct(sn, field)
+        connected = not bound or any(v in bound for v in variables(p))
+        return (not connected, estimate)
+
+    while remaining:
+        best = min(remaining, key=cost)
+        remaining.remove(best)
+        steps.append((best, cost(best)[1]))
+        bound.update(variables(best))
+    return steps
+
+
+def _bindings(sn, p, fixed=None):
+    constants = _constants(p)
+    if fixed is not None:
+        (field, value) = fixed
+        constants[field] = value
+    (user, e1, rel, e2, rel_type) = constants
+    for (_, d) in sn._iter_ids(user, e1, rel, rel_type, e2):
+        values, binding = _values(d), {}
+        for (x, value) in zip(p, values):
+            if is_var(x):
+                if binding.setdefault(x, value) != value:
+                    break
+        else:
+            yield binding
+
+
+def match(sn, patterns) -> list:
+    with sn.lock.read():
+        rows, bound = [{}], set()
+        for (p, _) in plan(sn, patterns):
+            shared = [v for v in variables(p) if v in bound]
+            table = {}
+
+            # campo indexado de uma variavel partilhada, para ler so as
+            # declaracoes com os valores que vao ser juntados
+            field = next((f for (f, x) in enumerate(p[:4]) if x in shared), None)
+            keys = list(dict.fromkeys(r[p[field]] for r in rows)) if field is not None else None
+            if keys is not None and len(keys) < cardinality(sn, p):
+                sources = [_bindings(sn, p, (field, k)) for k in keys]
+            else:
+                sources = [_bindings(sn, p)]
+            for source in sources:
+                for b in source:
+                    table.setdefault(tuple(b[v] for v in shared), []).append(b)
+
+            rows = [{**r, **b} for r in rows for b in table.get(tuple(r[v] for v in shared), ())]
+            bound.update(variables(p))
+            if not rows:
+                return []
+
+    return [dict(items) for items in dict.fromkeys(tuple(r.items()) for r in rows)]
@@ -0,0 +1,212 @@
+# Opt-in profiling of the SemanticNetwork and BayesNet query methods
+#
+#   with profiling.profile() as p:
+#       z.query('socrates', 'altura')
+#   print(p.to_json())
+#
+#   profiling.enable()          # every thread, until disable()
+#
+# While no profiler is active the methods are the original ones: the
+# wrappers are only installed on the classes by profile()/enable() and
+# removed when the last of them ends.  profile() only records the calls
+# of the thread that opened it.
+#
+# For each method: calls, cumulative and percentile latency, declarations
+# scanned (index candidates examined) versus returned, nesting depth of
+# profiled calls and query cache hits/misses.  Nested calls are counted
+# in full by every caller (times, scans and cache use are inclusive).
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from semantic_network import SemanticNetwork
+from bayes_net import BayesNet
+
+METHODS = {
+    SemanticNetwork: ['query_local', 'query', 'query2', 'query_cancel', 'query_down', 'query_induce',
+                      'query_local_assoc', 'query_assoc_value', 'query_batch', 'predecessor', 'predecessor_path',
+                      'list_associations', 'list_objects', 'list_users', 'list_types', 'list_local_associations',
+                      'list_relations_by_user', 'associations_by_user', 'list_local_associations_by_entity',
+                      'match'],
+    BayesNet: ['jointProb', 'individualProb', 'marginal', 'conditionalProb', 'approximateProb'],
+}
+
+# latency samples kept per method (reservoir sampling beyond this)
+SAMPLES = 10000
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+class MethodStats:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.samples = []
+        self.scanned = 0
+        self.returned = 0
+        self.max_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def to_dict(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {'calls': self.calls, 'total_ms': 1000 * self.seconds,
+                'mean_ms': 1000 * self.seconds / self.calls if self.calls else None,
+                'latency_ms': {p: 1000 * percentile(self.samples, q) if self.samples else None
+                               for (p, q) in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+                'scanned': self.scanned, 'returned': self.returned, 'max_depth': self.max_depth,
+                'cache_hits': self.cache_hits, 'cache_misses': self.cache_misses,
+                'cache_hit_rate': self.cache_hits / lookups if lookups else None}
+
+
+class Profiler:
+    def __init__(self):
+        self.methods = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(0)
+
+    def record(self, name, seconds, scanned, returned, depth, hits, misses):
+        with self.lock:
+            stats = self.methods.get(name)
+            if stats is None:
+                stats = self.methods[name] = MethodStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            if len(stats.samples) < SAMPLES:
+                stats.samples.append(seconds)
+            else:
+                k = self.random.randrange(stats.calls)
+                if k < SAMPLES:
+                    stats.samples[k] = seconds
+            stats.scanned += scanned
+            stats.returned += returned
+            stats.max_depth = max(stats.max_depth, depth)
+            stats.cache_hits += hits
+            stats.cache_misses += misses
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {name: stats.to_dict() for (name, stats) in sorted(self.methods.items())}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def reset(self):
+        with self.lock:
+            self.methods.clear()
+
+
+_local = threading.local()
+_global = None
+_installed = {}
+_install_count = 0
+_install_lock = threading.Lock()
+
+
+def _current():
+    return getattr(_local, 'profiler', None) or _global
+
+
+def _returned(result) -> int:
+    if isinstance(result, list):
+        return len(result)
+    return 0 if result is None else 1
+
+
+def _wrap(name, method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = _current()
+        if profiler is None:
+            return method(self, *args, **kwargs)
+
+        stack = _local.__dict__.setdefault('stack', [])
+        frame = [0]
+        stack.append(frame)
+        cache = getattr(self, 'cache', None)
+        (hits, misses) = (cache.hits, cache.misses) if cache is not None else (0, 0)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            depth = len(stack)
+            stack.pop()
+        if cache is not None:
+            (hits, misses) = (cache.hits - hits, cache.misses - misses)
+        profiler.record(name, seconds, frame[0], _returned(result), depth, hits, misses)
+        return result
+    return wrapper
+
+
+# every index lookup adds its candidates to the calls in progress
+def _wrap_candidates(method):
+    @wraps(method)
+    def wrapper(self, *args):
+        result = method(self, *args)
+        for frame in getattr(_local, 'stack', ()):
+            frame[0] += len(result)
+        return result
+    return wrapper
+
+
+def install():
+    global _install_count
+    with _install_lock:
+        _install_count += 1
+        if _install_count > 1:
+            return
+        for (cls, names) in METHODS.items():
+            for name in names:
+                _installed[(cls, name)] = cls.__dict__[name]
+                setattr(cls, name, _wrap(cls.__name__ + '.' + name, cls.__dict__[name]))
+        _installed[(SemanticNetwork, '_candidates')] = SemanticNetwork.__dict__['_candidates']
+        SemanticNetwork._candidates = _wrap_candidates(SemanticNetwork._candidates)
+
+
+def uninstall():
+    global _install_count
+    with _install_lock:
+        _install_count -= 1
+        if _install_count:
+            return
+        for ((cls, name), method) in _installed.items():
+            setattr(cls, name, method)
+        _installed.clear()
+
+
+# Profiles the calls made by this thread inside the context
+@contextmanager
+def profile(profiler=None):
+    profiler = Profiler() if profiler is None else profiler
+    previous = getattr(_local, 'profiler', None)
+    install()
+    _local.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _local.profiler = previous
+        uninstall()
+
+
+# Profiles the calls of every thread until disable()
+def enable(profiler=None) -> Profiler:
+    global _global
+    if _global is None:
+        install()
+    _global = Profiler() if profiler is None else profiler
+    return _global
+
+
+def disable() -> Profiler:
+    global _global
+    profiler, _global = _global, None
+    if profiler is not None:
+        uninstall()
+    return profiler
@@ -0,0 +1,66 @@
+# Cache de consultas
+# -- guarda resultados de consultas por heranca, indexados por
+#    (metodo, entidade, relacao), com remocao LRU quando cheia
+#    e invalidacao seletiva por entidade
+#
+from collections import OrderedDict, namedtuple
+from contextlib import nullcontext
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+MISSING = object()
+
+
+class QueryCache:
+    # lock: trinco (p.ex. threading.Lock) para uso por varias threads
+    def __init__(self, maxsize=1024, lock=None):
+        self.lock = nullcontext() if lock is None else lock
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.keys_by_entity = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key, MISSING)
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, entity, value):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            self.keys_by_entity.setdefault(entity, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                old_key, _ = self.entries.popitem(last=False)
+                self._forget(old_key)
+
+    def _forget(self, key):
+        # a entidade e sempre o segundo elemento da chave
+        keys = self.keys_by_entity.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_entity[key[1]]
+
+    def invalidate(self, entities):
+        with self.lock:
+            for entity in entities:
+                for key in self.keys_by_entity.pop(entity, ()):
+                    self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_entity.clear()
+
+    def info(self) -> CacheInfo:
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self.entries))
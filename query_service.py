@@ -0,0 +1,225 @@
+# asyncio front-end for SemanticNetwork and BayesNet queries
+#
+#   service = QueryService({'sn': z, 'bn': bn}, workers=2)
+#   server = await service.serve_tcp('127.0.0.1', 8765)   # or serve_unix(path)
+#
+# Line-delimited JSON: each request is one line
+#   {"id": 1, "target": "sn", "method": "query_assoc_value", "args": ["socrates", "altura"]}
+# (with optional "kwargs"; JSON arrays are passed as tuples and a
+# "rel_type" keyword may be a relation class name) and each response
+# one line, in completion order
+#   {"id": 1, "ok": true, "result": ..., "latency_ms": 0.3}
+#   {"id": 1, "ok": false, "error": "KeyError: 'x'"}
+# Declarations are returned as objects {user, relation, entity1, name,
+# entity2}.  The methods served are the profiled ones (profiling.METHODS);
+# the method "stats" of target "service" returns the latency
+# metrics (see profiling.MethodStats) and the coalescing counters.
+#
+# Identical requests in flight (same target, method and arguments) share
+# one computation.  The methods in OFFLOADED run in a bounded process
+# pool, on copies of the targets made when the workers start (the service
+# is read-only: changes to the targets are not seen by the workers); the
+# other ones run in a single worker thread, so the event loop is never
+# blocked and the targets are used by one thread at a time.  At most
+# max_pending requests are processed at once: beyond that the service
+# stops reading from the connections, and the clients' writes block.
+import asyncio
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from semantic_network import Declaration, RELATION_TYPES
+from profiling import METHODS, Profiler
+
+OFFLOADED = {'query_down', 'query_induce', 'query_batch',
+             'individualProb', 'marginal', 'conditionalProb', 'approximateProb'}
+
+# targets of the worker processes
+_targets = {}
+
+
+def _init_worker(targets):
+    _targets.update(targets)
+
+
+def _call(target, method, args, kwargs):
+    return getattr(_targets[target], method)(*args, **kwargs)
+
+
+def from_json(x):
+    if isinstance(x, list):
+        return tuple(from_json(v) for v in x)
+    if isinstance(x, dict):
+        return {k: from_json(v) for (k, v) in x.items()}
+    return x
+
+
+def to_json(x):
+    if isinstance(x, Declaration):
+        r = x.relation
+        return {'user': x.user, 'relation': type(r).__name__,
+                'entity1': r.entity1, 'name': r.name, 'entity2': r.entity2}
+    if hasattr(x, '_asdict'):
+        return to_json(x._asdict())
+    if isinstance(x, dict):
+        return {k if isinstance(k, (str, int, float, bool)) or k is None else str(k): to_json(v)
+                for (k, v) in x.items()}
+    if isinstance(x, (list, tuple, set, frozenset)):
+        return [to_json(v) for v in x]
+    if isinstance(x, (str, int, float, bool)) or x is None:
+        return x
+    return str(x)
+
+
+class QueryService:
+
+    def __init__(self, targets, workers=None, max_pending=64):
+        self.targets = dict(targets)
+        self.pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self.targets,)) \
+            if workers != 0 else None
+        self.thread = ThreadPoolExecutor(1)
+        self.max_pending = max_pending
+        self.pending = None  # semaphore, created in the event loop
+        self.in_flight = {}  # request key -> task
+        self.metrics = Profiler()
+        self.computed = 0
+        self.coalesced = 0
+
+    def _method(self, target, method):
+        obj = self.targets.get(target)
+        if obj is None:
+            raise KeyError("unknown target " + str(target))
+        if not any(isinstance(obj, cls) and method in names for (cls, names) in METHODS.items()):
+            raise ValueError("method not available: " + str(method))
+        return obj
+
+    async def _compute(self, target, method, args, kwargs):
+        loop = asyncio.get_running_loop()
+        self.computed += 1
+        if method in OFFLOADED and self.pool is not None:
+            return await loop.run_in_executor(self.pool, _call, target, method, args, kwargs)
+        obj = self.targets[target]
+        return await loop.run_in_executor(self.thread, lambda: getattr(obj, method)(*args, **kwargs))
+
+    # Result of a request, computed once for all identical requests in flight
+    async def execute(self, target, method, args=(), kwargs=None):
+        if target == 'service' and method == 'stats':
+            return self.stats()
+        self._method(target, method)
+        key = (target, method, json.dumps([args, kwargs or {}], sort_keys=True))
+        task = self.in_flight.get(key)
+        if task is None:
+            (args, kwargs) = (from_json(list(args)), from_json(kwargs or {}))
+            if isinstance(kwargs.get('rel_type'), str):
+                kwargs['rel_type'] = RELATION_TYPES[kwargs['rel_type']]
+            task = asyncio.ensure_future(self._compute(target, method, args, kwargs))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _respond(self, line, writer, lock):
+        start = time.perf_counter()
+        rid, name = None, 'invalid'
+        try:
+            request = json.loads(line)
+            rid = request.get('id')
+            name = '%s.%s' % (request.get('target'), request.get('method'))
+            result = await self.execute(request.get('target'), request.get('method'),
+                                        request.get('args', ()), request.get('kwargs'))
+            response = {'id': rid, 'ok': True, 'result': to_json(result)}
+        except Exception as e:
+            response = {'id': rid, 'ok': False, 'error': '%s: %s' % (type(e).__name__, e)}
+        finally:
+            self.pending.release()
+        seconds = time.perf_counter() - start
+        response['latency_ms'] = 1000 * seconds
+        self.metrics.record(name, seconds, 0, 1 if response['ok'] else 0, 0, 0, 0)
+        async with lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        if self.pending is None:
+            self.pending = asyncio.Semaphore(self.max_pending)
+        (tasks, lock) = (set(), asyncio.Lock())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await self.pending.acquire()
+                task = asyncio.ensure_future(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve_tcp(self, host='127.0.0.1', port=0):
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def serve_unix(self, path):
+        return await asyncio.start_unix_server(self.handle, path)
+
+    def stats(self) -> dict:
+        return {'methods': self.metrics.snapshot(), 'computed': self.computed, 'coalesced': self.coalesced,
+                'in_flight': len(self.in_flight)}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.thread.shutdown()
+
+
+# Client of a QueryService connection; calls can be concurrent
+class QueryClient:
+
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.ids = itertools.count()
+        self.waiting = {}
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect_tcp(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path):
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def _receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.waiting.pop(response['id'], None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("connection closed"))
+
+    # Full response of a request (with its latency)
+    async def request(self, target, method, *args, **kwargs) -> dict:
+        rid = next(self.ids)
+        future = self.waiting[rid] = asyncio.get_running_loop().create_future()
+        self.writer.write((json.dumps({'id': rid, 'target': target, 'method': method,
+                                       'args': list(args), 'kwargs': kwargs}) + '\n').encode())
+        await self.writer.drain()
+        return await future
+
+    async def call(self, target, method, *args, **kwargs):
+        response = await self.request(target, method, *args, **kwargs)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    async def close(self):
+        self.writer.close()
+        await self.receiver
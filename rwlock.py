@@ -0,0 +1,102 @@
+# Trinco de leitores/escritor
+# -- varios leitores em simultaneo ou um unico escritor; os pedidos de
+#    escrita tem prioridade sobre novas leituras
+#
+# Ambos sao reentrantes na mesma thread, e o escritor tambem pode ler;
+# passar de leitor a escritor nao e permitido (daria um impasse).
+#
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+
+class RWLock:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.readers = 0
+        self.writer = None
+        self.write_depth = 0
+        self.waiting_writers = 0
+        self.local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self.local, 'depth', 0)
+        if depth or self.writer == threading.get_ident():
+            self.local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self.local.depth = depth
+            return
+
+        with self.cond:
+            while self.writer is not None or self.waiting_writers:
+                self.cond.wait()
+            self.readers += 1
+        self.local.depth = 1
+        try:
+            yield
+        finally:
+            self.local.depth = 0
+            with self.cond:
+                self.readers -= 1
+                if not self.readers:
+                    self.cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        if self.writer == me:
+            self.write_depth += 1
+            try:
+                yield
+            finally:
+                self.write_depth -= 1
+            return
+        if getattr(self.local, 'depth', 0):
+            raise RuntimeError("cannot write while holding a read lock")
+
+        with self.cond:
+            self.waiting_writers += 1
+            while self.readers or self.writer is not None:
+                self.cond.wait()
+            self.waiting_writers -= 1
+            self.writer = me
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.writer = None
+                self.cond.notify_all()
+
+
+# trinco sem efeito, para redes usadas por uma unica thread
+class NullLock:
+    context = nullcontext()
+
+    def read(self):
+        return self.context
+
+    def write(self):
+        return self.context
+
+
+NULL_LOCK = NullLock()
+
+
+# decoradores de metodos de objetos com um atributo lock
+def reading(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writing(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
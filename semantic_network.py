@@ -7,9 +7,21 @@
 # (c) Luis Seabra Lopes, 2012-2020
 # v1.9 - 2019/10/20
 #
-from collections import Counter
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from fractions import Fraction
 from statistics import mean
-from functools import reduce
+from itertools import islice
+import heapq
+import threading
+import time
+
+from hierarchy import TypeHierarchy
+from query_cache import QueryCache, MISSING
+from rwlock import RWLock, NULL_LOCK, reading, writing
+from traversal import Traversal
+from symbols import symbols
 
 
 # Classe Relation, com as seguintes classes derivadas:
@@ -19,12 +31,28 @@ from functools import reduce
 #
 
 class Relation:
+    # entidades e nome guardados como identificadores da tabela de simbolos
+    __slots__ = ('_entity1', '_name', '_entity2')
+
     def __init__(self, e1, rel, e2):
         self.entity1 = e1
         #       self.relation = rel  # obsoleto
         self.name = rel
         self.entity2 = e2
 
+    entity1 = property(lambda self: symbols.values[self._entity1],
+                       lambda self, e: setattr(self, '_entity1', symbols.intern(e)))
+    name = property(lambda self: symbols.values[self._name],
+                    lambda self, n: setattr(self, '_name', symbols.intern(n)))
+    entity2 = property(lambda self: symbols.values[self._entity2],
+                       lambda self, e: setattr(self, '_entity2', symbols.intern(e)))
+
+    def __getstate__(self):
+        return self.entity1, self.name, self.entity2
+
+    def __setstate__(self, state):
+        self.entity1, self.name, self.entity2 = state
+
     def __str__(self):
         return self.name + "(" + str(self.entity1) + "," + \
             str(self.entity2) + ")"
@@ -35,6 +63,8 @@ class Relation:
 
 # Subclasse Association
 class Association(Relation):
+    __slots__ = ()
+
     def __init__(self, e1, assoc, e2):
         Relation.__init__(self, e1, assoc, e2)
 
@@ -43,17 +73,23 @@ class Association(Relation):
 #   entity = Association('socrates','professor','filosofia')
 
 class AssocOne(Association):
+    __slots__ = ()
+
     def __init__(self, e1, assoc, e2):
         Association.__init__(self, e1, assoc, e2)
 
 
 class AssocNum(Association):
+    __slots__ = ()
+
     def __init__(self, e1, assoc, e2):
         Association.__init__(self, e1, assoc, e2)
 
 
 # Subclasse Subtype
 class Subtype(Relation):
+    __slots__ = ()
+
     def __init__(self, sub, super):
         Relation.__init__(self, sub, "subtype", super)
 
@@ -63,6 +99,8 @@ class Subtype(Relation):
 
 # Subclasse Member
 class Member(Relation):
+    __slots__ = ()
+
     def __init__(self, obj, type):
         Relation.__init__(self, obj, "member", type)
 
@@ -75,10 +113,21 @@ class Member(Relation):
 #    na rede semantica
 #
 class Declaration:
+    __slots__ = ('_user', 'relation')
+
     def __init__(self, user, rel):
         self.user = user
         self.relation = rel
 
+    user = property(lambda self: symbols.values[self._user],
+                    lambda self, u: setattr(self, '_user', symbols.intern(u)))
+
+    def __getstate__(self):
+        return self.user, self.relation
+
+    def __setstate__(self, state):
+        self.user, self.relation = state
+
     def __str__(self):
         return "decl(" + str(self.user) + "," + str(self.relation) + ")"
 
@@ -91,145 +140,699 @@ class Declaration:
 #   ds = Declaration('darwin',s)
 #   dm = Declaration('descartes',m)
 
+# classe ValueCounts
+# -- valores (entity2) das declaracoes de uma entidade com um dado nome:
+#    identificadores por valor, soma exata dos valores numericos e tipo
+#    das associacoes, mantidos a cada insercao e remocao
+#
+class ValueCounts:
+    __slots__ = ('count', 'values', 'kinds', 'others', 'floats', 'total')
+
+    def __init__(self):
+        self.count = 0
+        self.values = {}  # valor -> {identificador: None}, por ordem crescente
+        self.kinds = {}  # identificador -> classe, so das associacoes
+        self.others = 0  # valores nao numericos
+        self.floats = 0
+        self.total = Fraction(0)
+
+    def update(self, did, rel, delta):
+        value = rel.entity2
+        self.count += delta
+        if delta > 0:
+            self.values.setdefault(value, {})[did] = None
+            if isinstance(rel, Association):
+                self.kinds[did] = type(rel)
+        else:
+            ids = self.values[value]
+            del ids[did]
+            if not ids:
+                del self.values[value]
+            self.kinds.pop(did, None)
+
+        if isinstance(value, (int, float)):
+            self.total += delta * Fraction(value)
+            self.floats += delta * isinstance(value, float)
+        else:
+            self.others += delta
+
+    # classe da primeira associacao (a que decide o tipo de resposta)
+    def kind(self):
+        return next(iter(self.kinds.values()), None)
+
+    # (valor, contagem) pela ordem da primeira ocorrencia, como num Counter
+    def items(self) -> list:
+        return [(v, len(ids)) for (v, ids) in sorted(self.values.items(), key=lambda item: next(iter(item[1])))]
+
+    def most_common(self) -> list:
+        return sorted(self.items(), key=lambda item: item[1], reverse=True)
+
+    # como statistics.mean: inteiro se os valores e a media forem inteiros
+    def mean(self):
+        if self.others:
+            return mean([v for (v, ids) in self.values.items() for _ in ids])
+        value = self.total / self.count
+        return float(value) if self.floats or value.denominator != 1 else int(value)
+
+
+# classe Statistics
+# -- contagens (com multiplicidade) dos valores distintos usados pelas
+#    operacoes list_*, atualizadas a cada insercao e remocao, e os
+#    agregados usados por query_local_assoc e query_induce
+#
+class Statistics:
+    def __init__(self):
+        self.assoc_names = {}  # nome -> numero de associacoes
+        self.objects = {}  # instancia -> numero de Member
+        self.users = {}  # utilizador -> numero de declaracoes
+        self.types = {}  # tipo -> numero de Member/Subtype
+        self.local_assocs = {}  # entidade -> {nome: contagem}
+        self.relations_by_user = {}  # utilizador -> {nome: contagem}
+        self.assocs_by_user = {}  # utilizador -> {nome: contagem}
+        self.local_assocs_by_entity = {}  # entidade -> {(nome, utilizador): contagem}
+        self.values = {}  # (entidade1, nome) -> ValueCounts
+        self.entity2 = {}  # (entidade2, nome) -> numero de declaracoes
+        self.rollups = {}  # tipo -> {nome: Counter dos valores nos descendentes}
+
+    @staticmethod
+    def _update(counter, key, delta):
+        n = counter.get(key, 0) + delta
+        if n:
+            counter[key] = n
+        else:
+            del counter[key]
+
+    def _nested(self, counters, outer, key, delta):
+        inner = counters.setdefault(outer, {})
+        self._update(inner, key, delta)
+        if not inner:
+            del counters[outer]
+
+    def update(self, decl, delta, did):
+        rel = decl.relation
+        values = self.values.get((rel.entity1, rel.name))
+        if values is None:
+            values = self.values[(rel.entity1, rel.name)] = ValueCounts()
+        values.update(did, rel, delta)
+        if not values.count:
+            del self.values[(rel.entity1, rel.name)]
+        self._update(self.entity2, (rel.entity2, rel.name), delta)
+
+        self._update(self.users, decl.user, delta)
+        self._nested(self.relations_by_user, decl.user, rel.name, delta)
+        if isinstance(rel, Association):
+            self._update(self.assoc_names, rel.name, delta)
+            self._nested(self.local_assocs, rel.entity1, rel.name, delta)
+            self._nested(self.assocs_by_user, decl.user, rel.name, delta)
+            self._nested(self.local_assocs_by_entity, rel.entity1, (rel.name, decl.user), delta)
+        if isinstance(rel, Member):
+            self._update(self.objects, rel.entity1, delta)
+        if isinstance(rel, (Member, Subtype)):
+            self._update(self.types, rel.entity2, delta)
+
+    def add(self, decl, did):
+        self.update(decl, 1, did)
+
+    def discard(self, decl, did):
+        self.update(decl, -1, did)
+
+    # os agregados por tipo deixam de valer quando muda algo abaixo deles
+    def invalidate(self, types):
+        for t in types:
+            self.rollups.pop(t, None)
+
+
+BulkLoadReport = namedtuple('BulkLoadReport', ['count', 'seconds', 'rate'])
+
+RELATION_TYPES = {cls.__name__: cls for cls in (Relation, Association, AssocOne, AssocNum, Subtype, Member)}
+
+
+# classe BulkLoader
+# -- insere declaracoes (ou tuplos (user, tipo de relacao, e1, nome, e2))
+#    numa rede semantica durante um carregamento em bloco
+#
+class BulkLoader:
+    def __init__(self, sn):
+        self.sn = sn
+        self.report = None
+
+    def insert(self, item):
+        if not isinstance(item, Declaration):
+            (user, rel_type, e1, name, e2) = item
+            cls = RELATION_TYPES.get(rel_type, rel_type)
+            rel = Relation.__new__(cls)
+            Relation.__init__(rel, e1, 'member' if cls is Member else 'subtype' if cls is Subtype else name, e2)
+            item = Declaration(user, rel)
+        self.sn.insert(item)
+
+    def insert_many(self, items):
+        for item in items:
+            self.insert(item)
+
+
+# rede de cada processo de query_batch
+_batch_net = None
+
+
+def _init_batch_worker(sn):
+    global _batch_net
+    _batch_net = sn
+
+
+def _run_worker_batch(requests) -> list:
+    return _batch_net._run_batch(requests)
+
+
 # classe SemanticNetwork
-# -- composta por um conjunto de declaracoes
-#    armazenado na forma de uma lista
+# -- composta por um conjunto de declaracoes, cada uma com um
+#    identificador estavel atribuido na insercao
+#
+# Com concurrent=True, varias threads podem consultar a rede enquanto outra
+# insere ou remove declaracoes: as consultas publicas partilham um trinco
+# de leitura e as alteracoes tem um trinco de escrita exclusivo.
+# Os iteradores preguicosos (iter_*) so fixam os candidatos de cada passo.
+#
+# As consultas por heranca percorrem a hierarquia iterativamente, visitando
+# cada tipo uma vez; max_depth limita o numero de niveis percorridos.
 #
 class SemanticNetwork:
-    def __init__(self, ldecl=None):
-        self.declarations = [] if ldecl is None else ldecl
+    def __init__(self, ldecl=None, cache_size=1024, concurrent=False, max_depth=None):
+        self.store = {}  # identificador -> declaracao, por ordem de insercao
+        self.ids = {}  # declaracao -> identificadores com que foi inserida
+        self.next_id = 0
+        # indices por utilizador, entidades, nome e classe da relacao;
+        # cada chave aponta para os identificadores (crescentes) das declaracoes
+        self.by_user = {}
+        self.by_entity1 = {}
+        self.by_entity2 = {}
+        self.by_name = {}
+        self.by_class = {}
+        self.hierarchy = TypeHierarchy()
+        self.stats = Statistics()
+        self.max_depth = max_depth
+        self._init_concurrency(cache_size, concurrent)
+        if ldecl:
+            self.insert_many(ldecl)
+
+    def _init_concurrency(self, cache_size, concurrent):
+        self.concurrent = concurrent
+        self.lock = RWLock() if concurrent else NULL_LOCK
+        self.cache = QueryCache(cache_size, threading.Lock() if concurrent else None)
+        self.local = threading.local()
+        self.version = 0  # incrementada a cada alteracao
+        self.batch_pool = None  # (versao, workers, processos) de query_batch
+
+    # uma copia da rede leva apenas as declaracoes (com os identificadores)
+    # e a configuracao; os indices sao reconstruidos
+    def __getstate__(self):
+        return {'declarations': list(self.store.items()), 'next_id': self.next_id,
+                'cache_size': self.cache.maxsize, 'concurrent': self.concurrent, 'max_depth': self.max_depth}
+
+    def __setstate__(self, state):
+        self.__init__(cache_size=state['cache_size'], concurrent=state['concurrent'], max_depth=state['max_depth'])
+        with self.bulk_load():
+            for (did, decl) in state['declarations']:
+                self.next_id = did
+                self.insert(decl)
+        self.next_id = state['next_id']
+
+    # resultado da ultima consulta local feita por esta thread
+    @property
+    def query_result(self) -> list:
+        return self.local.query_result
+
+    # copia de todas as declaracoes; para as contar, len(rede)
+    @property
+    @reading
+    def declarations(self) -> list:
+        return list(self.store.values())
+
+    def __len__(self):
+        return len(self.store)
 
     def __str__(self):
         return str(self.declarations)
 
-    def insert(self, decl):
-        self.declarations.append(decl)
-
+    # identificador da primeira declaracao de um carregamento em bloco (bulk_load)
+    _bulk_start = None
+
+    @writing
+    def insert(self, decl) -> int:
+        did = self.next_id
+        self.next_id += 1
+        self.version += 1
+        self.store[did] = decl
+        self.ids.setdefault(decl, []).append(did)
+        if self._bulk_start is None:
+            self._index(decl, did)
+            if isinstance(decl.relation, (Member, Subtype)):
+                self.hierarchy.add_edge(decl.relation.entity1, decl.relation.entity2, did)
+            self._invalidate(decl)
+        return did
+
+    def _keys(self, decl):
+        return ((self.by_user, decl.user), (self.by_entity1, decl.relation.entity1),
+                (self.by_entity2, decl.relation.entity2), (self.by_name, decl.relation.name),
+                (self.by_class, type(decl.relation)))
+
+    def _index(self, decl, did):
+        for (index, key) in self._keys(decl):
+            index.setdefault(key, {})[did] = None
+        self.stats.add(decl, did)
+
+    def _unindex(self, decl, did):
+        for (index, key) in self._keys(decl):
+            self._discard(index, key, did)
+        self.stats.discard(decl, did)
+
+    @staticmethod
+    def _discard(index, key, did):
+        ids = index[key]
+        del ids[did]
+        if not ids:
+            del index[key]
+
+    def insert_many(self, items) -> BulkLoadReport:
+        with self.bulk_load() as loader:
+            loader.insert_many(items)
+        return loader.report
+
+    # Carregamento em bloco: as declaracoes inseridas dentro do contexto
+    # so sao indexadas (e a hierarquia e a cache atualizadas) no fim
+    @contextmanager
+    def bulk_load(self):
+        with self.lock.write():
+            yield from self._bulk_load()
+
+    def _bulk_load(self):
+        loader = BulkLoader(self)
+        if self._bulk_start is not None:
+            yield loader
+            return
+
+        self._bulk_start = self.next_id
+        start_time = time.perf_counter()
+        try:
+            yield loader
+        finally:
+            start, self._bulk_start = self._bulk_start, None
+            self._index_bulk(start)
+            count, seconds = self.next_id - start, time.perf_counter() - start_time
+            loader.report = BulkLoadReport(count, seconds, count / seconds if seconds else None)
+
+    # indexa as declaracoes inseridas desde start (fim de um bulk_load)
+    def _index_bulk(self, start):
+        edges = []
+        for did in range(start, self.next_id):
+            decl = self.store.get(did)
+            if decl is None:
+                continue
+            self._index(decl, did)
+            if isinstance(decl.relation, (Member, Subtype)):
+                edges.append((decl.relation.entity1, decl.relation.entity2, did))
+        self.hierarchy.add_edges(edges)
+        self.version += 1
+        self.cache.clear()
+        self.stats.rollups.clear()
+
+    # Identificador de uma declaracao: a propria, se foi inserida,
+    # ou a primeira com os mesmos valores
+    @reading
+    def id_of(self, decl) -> int:
+        ids = self.ids.get(decl)
+        if ids:
+            return ids[0]
+        rel = decl.relation
+        for (did, d) in self._iter_ids(decl.user, rel.entity1, rel.name, type(rel), rel.entity2):
+            if type(d.relation) is type(rel):
+                return did
+        raise ValueError("declaration not in network")
+
+    # Remove uma declaracao, dada ou pelo seu identificador;
+    # devolve o identificador removido
+    @writing
+    def remove(self, decl) -> int:
+        did = decl if isinstance(decl, int) else self.id_of(decl)
+        decl = self.store.get(did)
+        if decl is None:
+            raise ValueError("declaration not in network")
+
+        self._invalidate(decl)
+        self.version += 1
+        del self.store[did]
+        ids = self.ids.get(decl)
+        if ids:
+            ids.remove(did)
+            if not ids:
+                del self.ids[decl]
+        if self._bulk_start is None or did < self._bulk_start:
+            self._unindex(decl, did)
+            if isinstance(decl.relation, (Member, Subtype)):
+                self.hierarchy.remove_edge(decl.relation.entity1, decl.relation.entity2, did)
+        return did
+
+    # Retira todas as declaracoes de um utilizador
+    def retract_user(self, user) -> int:
+        return self.retract(user=user)
+
+    # Retira as declaracoes que satisfazem os criterios (como em query_local)
+    @writing
+    def retract(self, user=None, e1=None, rel=None, rel_type=None, e2=None) -> int:
+        ids = [did for (did, _) in self._iter_ids(user, e1, rel, rel_type, e2)]
+        for did in ids:
+            self.remove(did)
+        return len(ids)
+
+    def _invalidate(self, decl):
+        # uma declaracao so altera as consultas por heranca das entidades
+        # que declara localmente e dos respetivos descendentes
+        entities = [decl.relation.entity1]
+        if isinstance(decl.relation, Association):
+            entities.append(decl.relation.entity2)
+        for e in entities:
+            self.cache.invalidate([e])
+            self.cache.invalidate(self.hierarchy.down.get(e, ()))
+        # e os agregados dos tipos acima das suas entidades
+        for e in (decl.relation.entity1, decl.relation.entity2):
+            self.stats.invalidate([e])
+            self.stats.invalidate(self.hierarchy.up.get(e, ()))
+
+    def _memo(self, key, compute):
+        value = self.cache.get(key)
+        if value is MISSING:
+            value = compute()
+            self.cache.put(key, key[1], value)
+        return value
+
+    def cache_info(self):
+        return self.cache.info()
+
+    @writing
+    def cache_clear(self):
+        self.cache.clear()
+        self.stats.rollups.clear()
+
+    @staticmethod
+    def _matches(d, user, e1, rel, rel_type, e2) -> bool:
+        return ((user is None or d.user == user)
+                and (e1 is None or d.relation.entity1 == e1)
+                and (rel is None or d.relation.name == rel)
+                and (rel_type is None or isinstance(d.relation, rel_type))
+                and (e2 is None or d.relation.entity2 == e2))
+
+    def _candidates(self, user, e1, rel, rel_type, e2):
+        # escolhe o indice mais seletivo; os restantes criterios sao
+        # verificados apenas sobre os candidatos desse indice
+        lists = [index.get(key, ()) for (index, key) in
+                 ((self.by_user, user), (self.by_entity1, e1), (self.by_name, rel), (self.by_entity2, e2))
+                 if key is not None]
+        best = min(lists, key=len, default=None)
+
+        if rel_type is not None:
+            by_type = [ids for (cls, ids) in self.by_class.items() if issubclass(cls, rel_type)]
+            if best is None or sum(map(len, by_type)) < len(best):
+                return list(heapq.merge(*by_type))
+
+        # copia, para a iteracao nao ser afetada por insercoes entretanto
+        return list(self.store if best is None else best)
+
+    # os candidatos sao fixados logo; as declaracoes sao lidas a medida
+    def _iter_ids(self, user=None, e1=None, rel=None, rel_type=None, e2=None):
+        candidates = self._candidates(user, e1, rel, rel_type, e2)
+        return ((did, d) for (did, d) in zip(candidates, map(self.store.get, candidates))
+                if d is not None and self._matches(d, user, e1, rel, rel_type, e2))
+
+    # -- preguicosa: o trinco so e obtido para fixar os candidatos, por isso
+    #    com alteracoes concorrentes o resultado pode misturar versoes
+    #    (query_local constroi a lista com o trinco)
+    @reading
+    def iter_query_local(self, user=None, e1=None, rel=None, rel_type=None, e2=None, limit=None, offset=0):
+        matches = (d for (_, d) in self._iter_ids(user, e1, rel, rel_type, e2))
+        return islice(matches, offset, None if limit is None else offset + limit)
+
+    def _query_local(self, user=None, e1=None, rel=None, rel_type=None, e2=None) -> list:
+        batch = getattr(self.local, 'batch', None)
+        if batch is None:
+            return list(self.iter_query_local(user, e1, rel, rel_type, e2))
+        key = (user, e1, rel, rel_type, e2)
+        if key not in batch:
+            batch[key] = list(self.iter_query_local(user, e1, rel, rel_type, e2))
+        return list(batch[key])
+
+    @reading
     def query_local(self, user=None, e1=None, rel=None, rel_type=None, e2=None):
-        self.query_result = \
-            [d for d in self.declarations
-             if (user is None or d.user == user)
-             and (e1 is None or d.relation.entity1 == e1)
-             and (rel is None or d.relation.name == rel)
-             and (rel_type is None or isinstance(d.relation, rel_type))
-             and (e2 is None or d.relation.entity2 == e2)]
-        return self.query_result
+        self.local.query_result = self._query_local(user, e1, rel, rel_type, e2)
+        return self.local.query_result
+
+    # Consulta por padroes com variaveis (ver pattern_query) e o seu plano
+    def match(self, patterns) -> list:
+        from pattern_query import match
+        return match(self, patterns)
+
+    def explain(self, patterns) -> list:
+        from pattern_query import plan
+        return plan(self, patterns)
 
     def show_query_result(self):
         for d in self.query_result:
             print(str(d))
 
+    @reading
     def list_associations(self) -> list:
-        return list({d.relation.name for d in self.declarations if isinstance(d.relation, Association)})
+        return list(self.stats.assoc_names)
 
+    @reading
     def list_objects(self) -> list:
-        return list({d.relation.entity1 for d in self.declarations if isinstance(d.relation, Member)})
+        return list(self.stats.objects)
 
+    @reading
     def list_users(self) -> list:
-        return list({d.user for d in self.declarations})
+        return list(self.stats.users)
 
+    @reading
     def list_types(self) -> list:
-        return list({d.relation.entity2 for d in self.declarations if
-                     isinstance(d.relation, Member) or isinstance(d.relation, Subtype)})
+        return list(self.stats.types)
 
+    @reading
     def list_local_associations(self, entity: str) -> list:
-        return list({d.relation.name for d in self.declarations if
-                     isinstance(d.relation, Association) and d.relation.entity1 == entity})
+        return list(self.stats.local_assocs.get(entity, ()))
 
+    @reading
     def list_relations_by_user(self, user: str) -> list:
-        return list({d.relation.name for d in self.declarations if d.user == user})
+        return list(self.stats.relations_by_user.get(user, ()))
 
+    @reading
     def associations_by_user(self, user: str) -> int:
-        return len(
-            {d.relation.name for d in self.declarations if d.user == user and isinstance(d.relation, Association)})
+        return len(self.stats.assocs_by_user.get(user, ()))
 
+    @reading
     def list_local_associations_by_entity(self, entity: str) -> list:
-        return list({(d.relation.name, d.user) for d in self.declarations if
-                     d.relation.entity1 == entity and isinstance(d.relation, Association)})
+        return list(self.stats.local_assocs_by_entity.get(entity, ()))
 
+    @reading
     def predecessor(self, goal: str, start: str) -> bool:
-        declarations_list = [d.relation for d in self.declarations if
-                             (isinstance(d.relation, Member) or isinstance(d.relation, Subtype))
-                             and d.relation.entity1 == start]
-
-        if len(declarations_list) == 1 and declarations_list[0].entity2 == goal:
-            return True
-
-        return any([self.predecessor(goal, d.entity2) for d in declarations_list])
+        return self.hierarchy.is_ancestor(goal, start)
 
+    @reading
     def predecessor_path(self, a: str, b: str) -> list | None:
-        decl = self.query_local(e1=b, rel_type=(Subtype, Member))
+        path = self.hierarchy.path(b, a)
+        return None if path is None else path[::-1]
+
+    # pais (ou filhos) de uma entidade, pela ordem da primeira declaracao
+    # ainda existente de cada um
+    def _parents(self, entity) -> tuple:
+        return tuple(self.hierarchy.parents.get(entity, ()))
 
-        if len(decl) == 0:
-            return [b]
+    def _children(self, entity) -> tuple:
+        return tuple(self.hierarchy.children.get(entity, ()))
 
-        if b in [d.relation.entity2 for d in decl]:
-            return [b, a]
+    # associacoes declaradas localmente numa entidade (como entity1 ou entity2)
+    def _local_assocs(self, entity, rel) -> tuple:
+        return self._memo(('local', entity, rel), lambda: tuple(
+            self._query_local(e1=entity, rel=rel, rel_type=Association) +
+            self._query_local(e2=entity, rel=rel, rel_type=Association)))
 
-        for d in decl:
-            if res := self.predecessor_path(b, d.relation.entity2):
-                return res + [b]
+    # a entidade e os seus antecessores, em profundidade, cada um uma vez
+    def _ancestors(self, entity):
+        return (node for (node, _) in Traversal(self._parents, self.max_depth).walk(entity))
 
+    @reading
     def query(self, entity: str, rel=None) -> list:
-        decl_local = (self.query_local(e1=entity, rel=rel, rel_type=Association) +
-                      self.query_local(e2=entity, rel=rel, rel_type=Association))
+        return list(self._memo(('query', entity, rel), lambda: self._query(entity, rel)))
 
-        pred_direct = self.query_local(e1=entity, rel_type=(Member, Subtype))
+    def iter_query(self, entity: str, rel=None, limit=None, offset=0):
+        return islice(self._iter_query(entity, rel), offset, None if limit is None else offset + limit)
 
-        decl = decl_local
-        for dp in pred_direct:
-            decl += self.query(dp.relation.entity2, rel)
+    def _iter_query(self, entity: str, rel=None):
+        cached = self.cache.get(('query', entity, rel))
+        if cached is not MISSING:
+            yield from cached
+            return
 
-        return decl
+        for node in self._ancestors(entity):
+            with self.lock.read():
+                local = self._local_assocs(node, rel)
+            yield from local
 
+    def _query(self, entity: str, rel=None) -> tuple:
+        return tuple(d for node in self._ancestors(entity) for d in self._local_assocs(node, rel))
+
+    @reading
     def query2(self, entity: str, rel: str = None) -> list:
-        decl_local = (self.query_local(e1=entity, rel=rel, rel_type=(Member, Subtype)) +
-                      self.query_local(e2=entity, rel=rel, rel_type=(Member, Subtype)))
+        decl_local = (self._query_local(e1=entity, rel=rel, rel_type=(Member, Subtype)) +
+                      self._query_local(e2=entity, rel=rel, rel_type=(Member, Subtype)))
 
         return decl_local + self.query(entity, rel)
 
+    @reading
     def query_cancel(self, entity: str, rel: str) -> list:
-        decl = (self.query_local(e1=entity, rel=rel, rel_type=Association) +
-                self.query_local(e2=entity, rel=rel, rel_type=Association))
-        decl_name = [d.relation.name for d in decl]
-
-        for pd in self.query_local(e1=entity, rel_type=(Member, Subtype)):
-            decl += [p for p in self.query_cancel(pd.relation.entity2, rel) if p.relation.name not in decl_name]
-
-        return decl
-
+        return list(self._memo(('query_cancel', entity, rel), lambda: self._query_cancel(entity, rel)))
+
+    # As associacoes de um antecessor sao canceladas por declaracoes com o
+    # mesmo nome num tipo mais abaixo, no caminho ate a entidade; o percurso
+    # e feito sobre pares (tipo, nomes ja declarados no caminho)
+    def _query_cancel(self, entity: str, rel: str) -> tuple:
+        def neighbours(state):
+            (node, names) = state
+            names = names | {d.relation.name for d in self._local_assocs(node, rel)}
+            return [(p, names) for p in self._parents(node)]
+
+        decl, seen = [], set()
+        for ((node, names), _) in Traversal(neighbours, self.max_depth).walk((entity, frozenset())):
+            for d in self._local_assocs(node, rel):
+                if d.relation.name not in names and id(d) not in seen:
+                    seen.add(id(d))
+                    decl.append(d)
+        return tuple(decl)
+
+    @reading
     def query_down(self, tipo: str, assoc: str, first: bool = True) -> list:
-        decl = ([] if first else self.query_local(e1=tipo, rel=assoc) + self.query_local(e2=tipo, rel=assoc))
-
-        for dd in self.query_local(e2=tipo, rel_type=(Member, Subtype)):
-            decl += [p for p in self.query_down(dd.relation.entity1, assoc, False)]
+        decl = []
+        for (node, depth) in Traversal(self._children, self.max_depth).walk(tipo):
+            if depth or not first:
+                decl += self._query_local(e1=node, rel=assoc) + self._query_local(e2=node, rel=assoc)
         return decl
 
+    @reading
     def query_induce(self, tipo: str, assoc: str) -> list:
-        return Counter([d.relation.entity2 for d in self.query_down(tipo, assoc)]).most_common(1)[0][0]
-
+        return self._rollup(tipo, assoc).most_common(1)[0][0]
+
+    # valores de assoc nos descendentes de um tipo (como em query_down),
+    # somados uma vez e guardados ate haver alteracoes abaixo do tipo
+    def _rollup(self, tipo, assoc) -> Counter:
+        rollups = self.stats.rollups.setdefault(tipo, {})
+        counts = rollups.get(assoc)
+        if counts is None:
+            counts = Counter()
+            for (node, depth) in Traversal(self._children, self.max_depth).walk(tipo):
+                if depth:
+                    values = self.stats.values.get((node, assoc))
+                    for (v, n) in values.items() if values else ():
+                        counts[v] += n
+                    if (node, assoc) in self.stats.entity2:
+                        counts[node] += self.stats.entity2[(node, assoc)]
+            rollups[assoc] = counts
+        return counts
+
+    @reading
     def query_local_assoc(self, entity: str, rel: str) -> tuple:
-        local = self.query_local(e1=entity, rel=rel)
-
-        for d in local:
-            if isinstance(d.relation, AssocOne):
-                valor, count = Counter([d.relation.entity2 for d in local]).most_common(1)[0]
-                return valor, count / len(local)
-            elif isinstance(d.relation, AssocNum):
-                return mean([d.relation.entity2 for d in local])
-            elif isinstance(d.relation, Association):
-                all_assoc = [(val, c / len(local)) for (val, c) in
-                             Counter([d.relation.entity2 for d in local]).most_common()]
-
-                def aux(carry, elem):
-                    l, lim = carry
-                    val, freq = elem
-                    return (l + [elem], lim + freq) if lim < 0.75 else l
-
-                return reduce(aux, all_assoc, ([], 0))
-
+        values = self.stats.values.get((entity, rel))
+        kind = values and values.kind()
+        if kind is None:
+            return None
+
+        if issubclass(kind, AssocOne):
+            valor, count = max(values.items(), key=lambda item: item[1])
+            return valor, count / values.count
+        elif issubclass(kind, AssocNum):
+            return values.mean()
+
+        # valores mais frequentes ate somarem pelo menos 75%
+        result, total = [], 0
+        for (val, count) in values.most_common():
+            if total >= 0.75:
+                break
+            result.append((val, count / values.count))
+            total += count / values.count
+        return result
+
+    # Metodos que podem ser pedidos em query_batch
+    BATCH_METHODS = frozenset(['query_local', 'query', 'query2', 'query_cancel', 'query_down', 'query_induce',
+                               'query_local_assoc', 'query_assoc_value', 'predecessor', 'predecessor_path',
+                               'list_local_associations', 'list_local_associations_by_entity'])
+
+    # Responde a uma lista de pedidos (metodo, argumentos) de uma so vez:
+    # pedidos repetidos sao calculados uma vez (e partilham a resposta),
+    # as pesquisas locais sao partilhadas entre pedidos e as consultas por
+    # heranca dos antecessores comuns ficam na cache.  Um pedido que falha
+    # tem como resposta a excecao, sem afetar os outros.  Com workers, os
+    # pedidos sao agrupados pelos tipos de topo das entidades e os grupos
+    # repartidos por processos, que recebem a rede uma so vez e sao
+    # reutilizados pelos lotes seguintes ate a rede ser alterada
+    @reading
+    def query_batch(self, requests, workers=None) -> list:
+        requests = [(method, tuple(args)) for (method, args) in requests]
+        for (method, _) in requests:
+            if method not in self.BATCH_METHODS:
+                raise ValueError("unknown batch method " + repr(method))
+        unique = list(dict.fromkeys(requests))
+
+        if not workers:
+            answers = dict(zip(unique, self._run_batch(unique)))
+        else:
+            partitions = self._partitions(unique, workers)
+            answers = {}
+            for (part, res) in zip(partitions, self._batch_executor(workers).map(_run_worker_batch, partitions)):
+                answers.update(zip(part, res))
+        return [answers[r] for r in requests]
+
+    def _run_batch(self, requests) -> list:
+        if getattr(self.local, 'batch', None) is not None:
+            return [self._answer(method, args) for (method, args) in requests]
+        self.local.batch = {}
+        try:
+            return [self._answer(method, args) for (method, args) in requests]
+        finally:
+            self.local.batch = None
+
+    def _answer(self, method, args):
+        try:
+            return getattr(self, method)(*args)
+        except Exception as e:
+            return e
+
+    def _batch_executor(self, workers) -> ProcessPoolExecutor:
+        if self.batch_pool is not None and self.batch_pool[:2] == (self.version, workers):
+            return self.batch_pool[2]
+        self.batch_close()
+        executor = ProcessPoolExecutor(workers, initializer=_init_batch_worker, initargs=(self,))
+        self.batch_pool = (self.version, workers, executor)
+        return executor
+
+    # Termina os processos de query_batch
+    def batch_close(self):
+        pool, self.batch_pool = self.batch_pool, None
+        if pool is not None:
+            pool[2].shutdown()
+
+    def _partitions(self, requests, n) -> list:
+        groups = {}
+        for (method, args) in requests:
+            entity = args[0] if args else None
+            roots = frozenset(a for a in self.hierarchy.ancestors(entity) | {entity}
+                              if not self.hierarchy.parents.get(a))
+            groups.setdefault(roots, []).append((method, args))
+        bins = [[] for _ in range(n)]
+        for group in sorted(groups.values(), key=len, reverse=True):
+            min(bins, key=len).extend(group)
+        return [b for b in bins if b]
+
+    @reading
     def query_assoc_value(self, E, A):
-        local = self.query_local(e1=E, rel=A)
+        return self._memo(('query_assoc_value', E, A), lambda: self._query_assoc_value(E, A))
+
+    def _query_assoc_value(self, E, A):
+        local = self._query_local(e1=E, rel=A)
         local_count = Counter([d.relation.entity2 for d in local]).most_common()
 
         if len(local_count) == 1:
@@ -0,0 +1,295 @@
+# Rede semantica particionada
+# -- as declaracoes sao distribuidas por N processos (shards) segundo
+#    um hash (crc32) de entity1; um coordenador expoe a mesma interface
+#    de consulta que SemanticNetwork
+#
+# Cada declaracao recebe do coordenador um identificador global, que o
+# shard usa como identificador local: os resultados de varios shards
+# sao juntados por ordem desses identificadores, ou seja, pela ordem de
+# insercao, como numa rede unica.
+#
+# As consultas locais com entity1 vao apenas ao shard dono da entidade;
+# as restantes sao enviadas a todos (scatter) e os resultados juntados
+# (gather).  A hierarquia (Member/Subtype) e replicada no coordenador,
+# que faz os percursos de heranca e pede de uma so vez as associacoes
+# locais dos tipos visitados, apenas aos shards que as podem ter: o dono
+# de cada tipo e os que guardam associacoes com o tipo como entity2.
+#
+import heapq
+import multiprocessing
+import threading
+import zlib
+
+from semantic_network import *
+from rwlock import RWLock, reading, writing
+
+
+def shard_of(entity, n) -> int:
+    return zlib.crc32(str(entity).encode()) % n
+
+
+# classe Shard
+# -- a parte da rede guardada num processo
+#
+class Shard:
+    def __init__(self, cache_size=1024):
+        self.net = SemanticNetwork(cache_size=cache_size)
+
+    def insert_many(self, items):
+        with self.net.bulk_load():
+            for (did, decl) in items:
+                self.net.next_id = did
+                self.net.insert(decl)
+
+    def remove(self, did):
+        decl = self.net.store[did]
+        self.net.remove(did)
+        return decl
+
+    def id_of(self, decl):
+        return self.net.id_of(decl)
+
+    def query_local(self, user, e1, rel, rel_type, e2) -> list:
+        return list(self.net._iter_ids(user, e1, rel, rel_type, e2))
+
+    # associacoes locais (como entity1 e como entity2) de varios tipos
+    def local_assocs(self, nodes, rel) -> dict:
+        return {node: (self.query_local(None, node, rel, Association, None),
+                       self.query_local(None, None, rel, Association, node))
+                for node in nodes}
+
+    def assoc_names_by_user(self, user) -> list:
+        return list(self.net.stats.assocs_by_user.get(user, ()))
+
+    def call(self, method, args):
+        return getattr(self.net, method)(*args)
+
+
+def _serve(conn, cache_size):
+    shard = Shard(cache_size)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        (method, args) = request
+        try:
+            conn.send((True, getattr(shard, method)(*args)))
+        except Exception as e:
+            conn.send((False, e))
+    conn.close()
+
+
+def _merge(lists) -> list:
+    return [d for (_, d) in heapq.merge(*lists, key=lambda item: item[0])]
+
+
+# classe ShardedSemanticNetwork
+# -- coordenador de N shards; pode ser usado por varias threads: as
+#    alteracoes tem um trinco de escrita e os percursos da hierarquia
+#    replicada um trinco de leitura
+#
+class ShardedSemanticNetwork:
+    def __init__(self, ldecl=None, shards=2, cache_size=1024, max_depth=None):
+        self.n = shards
+        self.conns, self.processes, self.locks = [], [], []
+        for _ in range(shards):
+            (conn, child) = multiprocessing.Pipe()
+            p = multiprocessing.Process(target=_serve, args=(child, cache_size), daemon=True)
+            p.start()
+            child.close()
+            self.conns.append(conn)
+            self.processes.append(p)
+            self.locks.append(threading.Lock())
+
+        self.next_id = 0
+        self.owner = {}  # identificador -> shard
+        self.targets = {}  # entity2 de associacoes -> {shard: contagem}
+        self.hierarchy = TypeHierarchy()
+        self.max_depth = max_depth
+        self.lock = RWLock()
+        self.local = threading.local()
+        if ldecl:
+            self.insert_many(ldecl)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for (conn, p) in zip(self.conns, self.processes):
+            conn.send(None)
+            conn.close()
+            p.join()
+        self.conns = []
+
+    @staticmethod
+    def _reply(conn):
+        (ok, result) = conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    # pedido a um so shard
+    def _route(self, k, method, *args):
+        with self.locks[k]:
+            self.conns[k].send((method, args))
+            return self._reply(self.conns[k])
+
+    # pedidos {shard: (metodo, argumentos)}, tratados em paralelo;
+    # os trincos sao sempre obtidos pela mesma ordem
+    def _gather(self, requests) -> dict:
+        shards = sorted(requests)
+        for k in shards:
+            self.locks[k].acquire()
+        try:
+            for k in shards:
+                self.conns[k].send(requests[k])
+            return {k: self._reply(self.conns[k]) for k in shards}
+        finally:
+            for k in shards:
+                self.locks[k].release()
+
+    # o mesmo pedido a todos os shards
+    def _scatter(self, method, *args) -> list:
+        return list(self._gather({k: (method, args) for k in range(self.n)}).values())
+
+    def _target(self, decl, k, delta):
+        if isinstance(decl.relation, Association):
+            counts = self.targets.setdefault(decl.relation.entity2, {})
+            counts[k] = counts.get(k, 0) + delta
+            if not counts[k]:
+                del counts[k]
+            if not counts:
+                del self.targets[decl.relation.entity2]
+
+    def insert(self, decl) -> int:
+        return self.insert_many([decl])[0]
+
+    @writing
+    def insert_many(self, decls) -> list:
+        parts = [[] for _ in range(self.n)]
+        ids = []
+        for decl in decls:
+            did, self.next_id = self.next_id, self.next_id + 1
+            k = shard_of(decl.relation.entity1, self.n)
+            parts[k].append((did, decl))
+            self.owner[did] = k
+            self._target(decl, k, 1)
+            ids.append(did)
+            if isinstance(decl.relation, (Member, Subtype)):
+                self.hierarchy.add_edge(decl.relation.entity1, decl.relation.entity2, did)
+        for (k, items) in enumerate(parts):
+            if items:
+                self._route(k, 'insert_many', items)
+        return ids
+
+    @writing
+    def remove(self, decl) -> int:
+        did = decl if isinstance(decl, int) else \
+            self._route(shard_of(decl.relation.entity1, self.n), 'id_of', decl)
+        if did not in self.owner:
+            raise ValueError("declaration not in network")
+        k = self.owner.pop(did)
+        decl = self._route(k, 'remove', did)
+        self._target(decl, k, -1)
+        if isinstance(decl.relation, (Member, Subtype)):
+            self.hierarchy.remove_edge(decl.relation.entity1, decl.relation.entity2, did)
+        return did
+
+    @property
+    def declarations(self) -> list:
+        return self._query_local()
+
+    def __len__(self):
+        return len(self.owner)
+
+    def _query_local(self, user=None, e1=None, rel=None, rel_type=None, e2=None) -> list:
+        if e1 is not None:
+            return [d for (_, d) in self._route(shard_of(e1, self.n), 'query_local', user, e1, rel, rel_type, e2)]
+        return _merge(self._scatter('query_local', user, e1, rel, rel_type, e2))
+
+    def query_local(self, user=None, e1=None, rel=None, rel_type=None, e2=None) -> list:
+        self.local.query_result = self._query_local(user, e1, rel, rel_type, e2)
+        return self.local.query_result
+
+    @property
+    def query_result(self) -> list:
+        return self.local.query_result
+
+    def show_query_result(self):
+        for d in self.query_result:
+            print(str(d))
+
+    # -- consultas por heranca: o percurso e o de SemanticNetwork, sobre a
+    #    hierarquia replicada e as associacoes pedidas antecipadamente
+
+    def _parents(self, entity) -> tuple:
+        return tuple(self.hierarchy.parents.get(entity, ()))
+
+    _ancestors = SemanticNetwork._ancestors
+    _query = SemanticNetwork._query
+    _query_cancel = SemanticNetwork._query_cancel
+
+    def _fetch(self, entity, rel):
+        nodes = list(self._ancestors(entity))
+        by_shard = {}
+        for node in nodes:
+            for k in {shard_of(node, self.n), *self.targets.get(node, ())}:
+                by_shard.setdefault(k, []).append(node)
+        parts = self._gather({k: ('local_assocs', (ns, rel)) for (k, ns) in by_shard.items()}).values()
+        self.local.assocs = {node: tuple(_merge([p[node][0] for p in parts if node in p]) +
+                                         _merge([p[node][1] for p in parts if node in p]))
+                             for node in nodes}
+
+    def _local_assocs(self, entity, rel) -> tuple:
+        return self.local.assocs[entity]
+
+    @reading
+    def query(self, entity, rel=None) -> list:
+        self._fetch(entity, rel)
+        return list(self._query(entity, rel))
+
+    @reading
+    def query_cancel(self, entity, rel) -> list:
+        self._fetch(entity, rel)
+        return list(self._query_cancel(entity, rel))
+
+    @reading
+    def predecessor(self, goal, start) -> bool:
+        return self.hierarchy.is_ancestor(goal, start)
+
+    @reading
+    def predecessor_path(self, a, b) -> list | None:
+        path = self.hierarchy.path(b, a)
+        return None if path is None else path[::-1]
+
+    # -- listagens: juntam as de todos os shards, ou so a do dono da entidade
+
+    def _union(self, method, *args) -> list:
+        return list(dict.fromkeys(x for part in self._scatter('call', method, args) for x in part))
+
+    def list_associations(self) -> list:
+        return self._union('list_associations')
+
+    def list_objects(self) -> list:
+        return self._union('list_objects')
+
+    def list_users(self) -> list:
+        return self._union('list_users')
+
+    def list_types(self) -> list:
+        return self._union('list_types')
+
+    def list_local_associations(self, entity) -> list:
+        return self._route(shard_of(entity, self.n), 'call', 'list_local_associations', (entity,))
+
+    def list_relations_by_user(self, user) -> list:
+        return self._union('list_relations_by_user', user)
+
+    def associations_by_user(self, user) -> int:
+        return len(set().union(*self._scatter('assoc_names_by_user', user)))
+
+    def list_local_associations_by_entity(self, entity) -> list:
+        return self._route(shard_of(entity, self.n), 'call', 'list_local_associations_by_entity', (entity,))
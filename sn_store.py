@@ -0,0 +1,415 @@
+# Armazenamento persistente de redes semanticas
+# -- instantaneo binario (snapshot) lido por mmap, sem copias,
+#    mais um registo (log) das declaracoes inseridas depois dele
+#
+# Formato do snapshot (inteiros little-endian, seccoes alinhadas a 8 bytes):
+#   - cabecalho: MAGIC, numero de simbolos, numero de declaracoes e
+#     a tabela (posicao, tamanho) das seccoes
+#   - tabela de simbolos: bytes de cada valor (etiqueta de tipo + dados), mais
+#     os identificadores ordenados pelos bytes (pesquisa binaria)
+#   - tabela de declaracoes em colunas: utilizador, classe, entidade1,
+#     nome e entidade2 de cada declaracao
+#   - indices prontos (CSR): para cada simbolo (ou classe), as posicoes
+#     das declaracoes em que aparece, por ordem crescente
+#
+# O log tem uma linha JSON por declaracao inserida, [user, classe, e1, nome, e2],
+# ou removida, ['-', identificador].
+#
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+from contextlib import contextmanager
+from itertools import chain
+from types import MappingProxyType
+
+from semantic_network import *
+from rwlock import writing
+
+MAGIC = b'SNSNAP01'
+CLASSES = [Relation, Association, AssocOne, AssocNum, Subtype, Member]
+CLASS_CODE = {cls: code for (code, cls) in enumerate(CLASSES)}
+FIELDS = ['user', 'entity1', 'name', 'entity2']
+SECTIONS = (['sym_offsets', 'sym_sorted', 'sym_blob', 'col_class']
+            + ['col_' + f for f in FIELDS]
+            + [kind + '_' + f for f in FIELDS + ['class'] for kind in ('ptr', 'pos')])
+HEADER = struct.Struct('<8sQQ' + 'QQ' * len(SECTIONS))
+
+
+def encode(value) -> bytes:
+    if isinstance(value, bool):
+        return b'b1' if value else b'b0'
+    if isinstance(value, str):
+        return b's' + value.encode()
+    if isinstance(value, int):
+        return b'i' + str(value).encode()
+    if isinstance(value, float):
+        return b'f' + struct.pack('<d', value)
+    if value is None:
+        return b'n'
+    raise TypeError("cannot store value " + repr(value))
+
+
+# codificacoes dos valores iguais a value: como nos indices em memoria,
+# os numeros iguais sao a mesma chave (1 == 1.0 == True)
+def equivalents(value) -> list:
+    res = {encode(value)}
+    if isinstance(value, (int, float)):
+        try:
+            f = float(value)
+        except OverflowError:
+            f = None
+        if f is not None and f == value:
+            res.add(encode(f))
+            if f == 0:
+                res.add(encode(-f))
+            if f.is_integer():
+                res.add(encode(int(f)))
+        if value in (0, 1):
+            res.add(encode(bool(value)))
+    return sorted(res)
+
+
+def decode(data: bytes):
+    tag, payload = data[:1], data[1:]
+    if tag == b's':
+        return payload.decode()
+    if tag == b'i':
+        return int(payload)
+    if tag == b'f':
+        return struct.unpack('<d', payload)[0]
+    if tag == b'b':
+        return payload == b'1'
+    return None
+
+
+def _field(decl, f):
+    return decl.user if f == 'user' else getattr(decl.relation, f)
+
+
+def save(sn, path):
+    decls = list(sn.declarations)
+    ids, blobs = {}, []
+    columns = {f: array('i') for f in FIELDS}
+    classes = array('i')
+    for d in decls:
+        if type(d.relation) not in CLASS_CODE:
+            raise TypeError("cannot store relation class " + type(d.relation).__name__)
+        classes.append(CLASS_CODE[type(d.relation)])
+        for f in FIELDS:
+            data = encode(_field(d, f))
+            sid = ids.get(data)
+            if sid is None:
+                sid = ids[data] = len(blobs)
+                blobs.append(data)
+            columns[f].append(sid)
+
+    offsets = array('q', [0])
+    for b in blobs:
+        offsets.append(offsets[-1] + len(b))
+    sections = {'sym_offsets': offsets.tobytes(),
+                'sym_sorted': array('i', sorted(range(len(blobs)), key=blobs.__getitem__)).tobytes(),
+                'sym_blob': b''.join(blobs)}
+    for (f, col) in list(columns.items()) + [('class', classes)]:
+        sections['col_' + f] = col.tobytes()
+        size = len(CLASSES) if f == 'class' else len(blobs)
+        ptr = array('q', [0] * (size + 1))
+        for key in col:
+            ptr[key + 1] += 1
+        for k in range(size):
+            ptr[k + 1] += ptr[k]
+        fill = array('q', ptr[:-1])
+        pos = array('i', [0] * len(col))
+        for (p, key) in enumerate(col):
+            pos[fill[key]] = p
+            fill[key] += 1
+        sections['ptr_' + f] = ptr.tobytes()
+        sections['pos_' + f] = pos.tobytes()
+
+    table, offset = [], HEADER.size
+    for name in SECTIONS:
+        offset += -offset % 8
+        table += [offset, len(sections[name])]
+        offset += len(sections[name])
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(blobs), len(decls), *table))
+        for (name, start) in zip(SECTIONS, table[::2]):
+            f.write(bytes(start - f.tell()))
+            f.write(sections[name])
+    os.replace(tmp, path)
+    open(path + '.log', 'w').close()
+
+
+# identificadores de uma chave: os do snapshot (memoryview), sem os
+# removidos, mais os inseridos depois
+class Positions:
+    def __init__(self, base, extra, removed):
+        self.base = base
+        self.extra = extra
+        self.removed = removed
+
+    def __len__(self):
+        return len(self.base) + len(self.extra)
+
+    def __iter__(self):
+        base = self.base if not self.removed else (i for i in self.base if i not in self.removed)
+        return chain(base, self.extra)
+
+
+class MappedIndex:
+    def __init__(self, store, field):
+        self.store = store
+        self.ptr = store.section('ptr_' + field, 'q')
+        self.pos = store.section('pos_' + field, 'i')
+        self.extra = {}
+
+    def _base(self, key):
+        slices = [self.pos[self.ptr[sid]:self.ptr[sid + 1]] for sid in self.store.lookup(key)]
+        if len(slices) == 1:
+            return slices[0]
+        return array('i', sorted(chain(*slices))) if slices else self.pos[0:0]
+
+    def get(self, key, default=None):
+        base, extra = self._base(key), self.extra.get(key, {})
+        return Positions(base, extra, self.store.removed) if len(base) or extra else default
+
+    def setdefault(self, key, default):
+        return self.extra.setdefault(key, default)
+
+
+class MappedClassIndex(MappedIndex):
+    def _base(self, cls):
+        code = CLASS_CODE.get(cls)
+        return self.pos[self.ptr[code]:self.ptr[code + 1]] if code is not None else self.pos[0:0]
+
+    def items(self):
+        return [(cls, self.get(cls)) for cls in set(CLASSES) | set(self.extra) if self.get(cls)]
+
+
+# declaracoes por identificador: as do snapshot ainda nao removidas,
+# mais as inseridas depois
+class MappedStore:
+    def __init__(self, sn):
+        self.sn = sn
+        self.extra = {}
+
+    def __len__(self):
+        return self.sn.size - len(self.sn.removed) + len(self.extra)
+
+    def __contains__(self, did):
+        return did in self.extra or (0 <= did < self.sn.size and did not in self.sn.removed)
+
+    def __getitem__(self, did):
+        if did in self:
+            return self.extra[did] if did >= self.sn.size else self.sn.declaration(did)
+        raise KeyError(did)
+
+    def get(self, did, default=None):
+        return self[did] if did in self else default
+
+    def __setitem__(self, did, decl):
+        self.extra[did] = decl
+
+    def __delitem__(self, did):
+        if did >= self.sn.size:
+            del self.extra[did]
+        else:
+            self.sn.removed.add(did)
+
+    def __iter__(self):
+        return chain((i for i in range(self.sn.size) if i not in self.sn.removed), self.extra)
+
+    def values(self):
+        return map(self.__getitem__, self)
+
+
+# recetor das alteracoes a hierarquia e as estatisticas enquanto estas
+# ainda nao foram construidas: quando o forem, ja as incluem (sao feitas
+# a partir do store e dos indices)
+class _Deferred:
+    parents = children = up = down = MappingProxyType({})
+    rollups = {}  # sempre vazio
+
+    def _ignore(self, *args):
+        pass
+
+    add_edge = add_edges = remove_edge = add = discard = invalidate = _ignore
+
+
+_DEFERRED = _Deferred()
+
+
+# classe MappedSemanticNetwork
+# -- rede semantica lida de um snapshot; as declaracoes inseridas ou
+#    removidas depois ficam em memoria e sao acrescentadas ao log
+#
+class MappedSemanticNetwork(SemanticNetwork):
+    def __init__(self, path, cache_size=1024, concurrent=False, max_depth=None):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_symbols, self.size, *table = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            raise ValueError(path + " is not a semantic network snapshot")
+        self.sections = {name: (table[2 * i], table[2 * i + 1]) for (i, name) in enumerate(SECTIONS)}
+        self.view = memoryview(self.mm)
+
+        self.sym_offsets = self.section('sym_offsets', 'q')
+        self.sym_sorted = self.section('sym_sorted', 'i')
+        self.sym_blob = self.section('sym_blob', 'B')
+        self.columns = {f: self.section('col_' + f, 'i') for f in FIELDS + ['class']}
+
+        self.removed = set()
+        self.store = MappedStore(self)
+        self.ids = {}
+        self.next_id = self.size
+        self.by_user = MappedIndex(self, 'user')
+        self.by_entity1 = MappedIndex(self, 'entity1')
+        self.by_entity2 = MappedIndex(self, 'entity2')
+        self.by_name = MappedIndex(self, 'name')
+        self.by_class = MappedClassIndex(self, 'class')
+        self._hierarchy = None
+        self._stats = None
+        self._deferring = False
+        self.max_depth = max_depth
+        self._init_concurrency(cache_size, concurrent)
+
+        self.log = None
+        if os.path.exists(path + '.log'):
+            with open(path + '.log') as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row[0] == '-':
+                        self.remove(row[1])
+                    else:
+                        self.insert(self._from_row(row))
+        self.log = open(path + '.log', 'a')
+
+    def __reduce__(self):
+        return MappedSemanticNetwork, (self.path, self.cache.maxsize, self.concurrent, self.max_depth)
+
+    def section(self, name, fmt):
+        (start, size) = self.sections[name]
+        return self.view[start:start + size].cast(fmt)
+
+    def symbol(self, sid):
+        return decode(bytes(self.sym_blob[self.sym_offsets[sid]:self.sym_offsets[sid + 1]]))
+
+    # identificadores no snapshot dos valores iguais a value
+    def lookup(self, value) -> list:
+        try:
+            keys = equivalents(value)
+        except TypeError:
+            return []
+        return [sid for sid in map(self._search, keys) if sid is not None]
+
+    # identificador de uma codificacao, por pesquisa binaria
+    def _search(self, data):
+        (lo, hi) = (0, self.n_symbols)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            sid = self.sym_sorted[mid]
+            current = bytes(self.sym_blob[self.sym_offsets[sid]:self.sym_offsets[sid + 1]])
+            if current < data:
+                lo = mid + 1
+            elif current > data:
+                hi = mid
+            else:
+                return sid
+        return None
+
+    def declaration(self, pos):
+        rel = Relation.__new__(CLASSES[self.columns['class'][pos]])
+        Relation.__init__(rel, self.symbol(self.columns['entity1'][pos]), self.symbol(self.columns['name'][pos]),
+                          self.symbol(self.columns['entity2'][pos]))
+        return Declaration(self.symbol(self.columns['user'][pos]), rel)
+
+    @staticmethod
+    def _from_row(row):
+        (user, cls, e1, name, e2) = row
+        rel = Relation.__new__(CLASSES[cls])
+        Relation.__init__(rel, e1, name, e2)
+        return Declaration(user, rel)
+
+    # a hierarquia so e construida quando e usada pela primeira vez
+    @property
+    def hierarchy(self):
+        if self._hierarchy is None:
+            if self._deferring:
+                return _DEFERRED
+            self._hierarchy = TypeHierarchy()
+            for did in heapq.merge(self.by_class.get(Subtype, []), self.by_class.get(Member, [])):
+                d = self.store[did]
+                self._hierarchy.add_edge(d.relation.entity1, d.relation.entity2, did)
+        return self._hierarchy
+
+    # as estatisticas do snapshot tambem sao calculadas no primeiro uso
+    @property
+    def stats(self):
+        if self._stats is None:
+            if self._deferring:
+                return _DEFERRED
+            # (as de um bulk_load em curso so sao contadas quando indexadas)
+            self._stats = Statistics()
+            for did in self.store:
+                if self._bulk_start is None or did < self._bulk_start:
+                    self._stats.add(self.store[did], did)
+        return self._stats
+
+    @writing
+    def insert(self, decl) -> int:
+        if type(decl.relation) not in CLASS_CODE:
+            raise TypeError("cannot store relation class " + type(decl.relation).__name__)
+        if self.log is not None:
+            self.log.write(json.dumps([decl.user, CLASS_CODE[type(decl.relation)], decl.relation.entity1,
+                                       decl.relation.name, decl.relation.entity2]) + '\n')
+            self.log.flush()
+        with self._deferred():
+            return SemanticNetwork.insert(self, decl)
+
+    @writing
+    def remove(self, decl) -> int:
+        with self._deferred():
+            did = SemanticNetwork.remove(self, decl)
+        if self.log is not None:
+            self.log.write(json.dumps(['-', did]) + '\n')
+            self.log.flush()
+        return did
+
+    # -- uma alteracao nao obriga a construir a hierarquia e as estatisticas
+    #    (por exemplo, ao repetir o log): se ainda nao existem, nao ha
+    #    consultas por heranca nem agregados em cache que dependam delas
+    @contextmanager
+    def _deferred(self):
+        self._deferring = True
+        try:
+            yield
+        finally:
+            self._deferring = False
+
+    def _index_bulk(self, start):
+        with self._deferred():
+            SemanticNetwork._index_bulk(self, start)
+
+    # as declaracoes do snapshot removidas ficam apenas marcadas
+    def _discard(self, index, key, did):
+        if did < self.size:
+            return
+        ids = index.extra[key]
+        del ids[did]
+        if not ids:
+            del index.extra[key]
+
+    # o mapeamento em memoria e libertado quando a rede deixar de ser usada
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+
+def load(path, cache_size=1024, concurrent=False, max_depth=None) -> MappedSemanticNetwork:
+    return MappedSemanticNetwork(path, cache_size, concurrent, max_depth)
@@ -0,0 +1,32 @@
+# Tabela de simbolos
+# -- atribui um identificador inteiro pequeno a cada valor (entidade,
+#    nome de relacao ou utilizador), guardado uma unica vez
+#
+# Os valores sao indexados pelo par (tipo, valor), para que 1, 1.0 e
+# True continuem a ser simbolos distintos.
+#
+
+class SymbolTable:
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value) -> int:
+        key = (type(value), value)
+        sid = self.ids.get(key)
+        if sid is None:
+            sid = self.ids[key] = len(self.values)
+            self.values.append(value)
+        return sid
+
+    def lookup(self, value) -> int | None:
+        return self.ids.get((type(value), value))
+
+    def value(self, sid):
+        return self.values[sid]
+
+
+symbols = SymbolTable()
@@ -0,0 +1,69 @@
+import random
+from collections import Counter
+from statistics import mean
+from semantic_network import *
+import sn_store
+from tests.test_aula8 import sn_net2
+
+
+def local_assoc(z, entity, rel):
+    local = z.query_local(e1=entity, rel=rel)
+    for d in local:
+        if isinstance(d.relation, AssocOne):
+            valor, count = Counter([d.relation.entity2 for d in local]).most_common(1)[0]
+            return valor, count / len(local)
+        elif isinstance(d.relation, AssocNum):
+            return mean([d.relation.entity2 for d in local])
+        elif isinstance(d.relation, Association):
+            result, total = [], 0
+            for (val, c) in Counter([d.relation.entity2 for d in local]).most_common():
+                if total >= 0.75:
+                    break
+                result.append((val, c / len(local)))
+                total += c / len(local)
+            return result
+
+
+def induce(z, tipo, assoc):
+    counts = Counter([d.relation.entity2 for d in z.query_down(tipo, assoc)]).most_common(1)
+    return counts[0][0] if counts else None
+
+
+def test_mean_types(sn_net2):
+    assert sn_net2.query_local_assoc('socrates', 'pulsacao') == 56
+    sn_net2.insert(Declaration('darwin', AssocNum('socrates', 'pulsacao', 57)))
+    assert sn_net2.query_local_assoc('socrates', 'pulsacao') == local_assoc(sn_net2, 'socrates', 'pulsacao')
+    assert isinstance(sn_net2.query_local_assoc('socrates', 'pulsacao'), float)
+    assert sn_net2.query_local_assoc('socrates', 'nada') is None
+
+
+def test_random_updates():
+    rnd = random.Random(1)
+    types = ['t%d' % i for i in range(8)]
+    z = SemanticNetwork([Declaration('u', Subtype(t, rnd.choice(types[:i]))) for (i, t) in enumerate(types) if i])
+    kinds = [(Association, 'gosta', ['a', 'b', 'c', 'd']), (AssocOne, 'pai', ['p', 'q']),
+             (AssocNum, 'peso', [1, 2, 2.5, 4])]
+    ids = []
+    for step in range(400):
+        if ids and rnd.random() < 0.3:
+            z.remove(ids.pop(rnd.randrange(len(ids))))
+        else:
+            (cls, name, values) = rnd.choice(kinds)
+            ids.append(z.insert(Declaration(rnd.choice('xyz'), cls(rnd.choice(types), name, rnd.choice(values)))))
+        if step % 10 == 0:
+            for t in types:
+                for (_, name, _) in kinds:
+                    assert z.query_local_assoc(t, name) == local_assoc(z, t, name)
+                    if induce(z, t, name) is not None:
+                        assert z.query_induce(t, name) == induce(z, t, name)
+
+
+def test_mapped_aggregates(sn_net2, tmp_path):
+    path = str(tmp_path / 'net.snap')
+    sn_store.save(sn_net2, path)
+    z = sn_store.load(path)
+    for (e, rel) in (('socrates', 'pai'), ('socrates', 'pulsacao'), ('homem', 'gosta')):
+        assert z.query_local_assoc(e, rel) == sn_net2.query_local_assoc(e, rel)
+    z.insert(Declaration('darwin', AssocOne('socrates', 'pai', 'pericles')))
+    assert z.query_local_assoc('socrates', 'pai') == ('sofronisco', 0.5)
+    z.close()
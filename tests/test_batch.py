@@ -0,0 +1,75 @@
+import pickle
+import pytest
+from semantic_network import *
+from tests.test_aula6 import sn_net
+
+
+def same(a, b):
+    return repr(a) == repr(b)
+
+REQUESTS = [('query_assoc_value', ('socrates', 'altura')), ('query_local_assoc', ('socrates', 'altura')),
+            ('query', ('platao', 'altura')), ('query_assoc_value', ('socrates', 'altura')),
+            ('query_cancel', ('platao', 'altura')), ('query_down', ('vertebrado', 'altura')),
+            ('query_induce', ('vertebrado', 'altura')), ('predecessor', ('vertebrado', 'socrates')),
+            ('query_local', ('descartes',))]
+
+
+def test_batch_matches_single_queries(sn_net):
+    expected = [getattr(sn_net, method)(*args) for (method, args) in REQUESTS]
+    sn_net.cache_clear()
+    assert same(sn_net.query_batch(REQUESTS), expected)
+    assert same(sn_net.query_batch(REQUESTS, workers=2), expected)
+
+
+def test_batch_shares_local_lookups(sn_net, monkeypatch):
+    calls = []
+    candidates = sn_net._candidates
+    monkeypatch.setattr(sn_net, '_candidates', lambda *args: calls.append(args) or candidates(*args))
+    requests = [r for e in ('socrates', 'platao', 'homem')
+                for r in (('query_local', (None, e, 'altura')), ('query_assoc_value', (e, 'altura')))]
+    for (method, args) in requests:
+        getattr(sn_net, method)(*args)
+    single = len(calls)
+    sn_net.cache_clear()
+    calls.clear()
+    sn_net.query_batch(requests + requests)
+    assert len(calls) < single
+
+
+def test_batch_unknown_method(sn_net):
+    with pytest.raises(ValueError):
+        sn_net.query_batch([('insert', (None,))])
+
+
+def test_pickle_keeps_ids(sn_net):
+    did = sn_net.id_of(sn_net.declarations[3])
+    sn_net.remove(sn_net.declarations[0])
+    copy = pickle.loads(pickle.dumps(sn_net))
+    assert same(copy.declarations, sn_net.declarations)
+    assert copy.id_of(sn_net.declarations[2]) == did
+    assert same(copy.query('socrates', 'altura'), sn_net.query('socrates', 'altura'))
+    assert copy.insert(Declaration('kant', Association('kant', 'gosta', 'razao'))) == sn_net.next_id
+
+
+def test_batch_errors_per_request(sn_net):
+    requests = [('query_assoc_value', ('socrates', 'altura')), ('query_assoc_value', ('ninguem', 'nada')),
+                ('query_local', (None, 'platao'))]
+    for workers in (None, 2):
+        res = sn_net.query_batch(requests, workers=workers)
+        assert res[0] == sn_net.query_assoc_value('socrates', 'altura')
+        assert isinstance(res[1], IndexError)
+        assert same(res[2], sn_net.query_local(None, 'platao'))
+    sn_net.batch_close()
+
+
+def test_batch_workers_reused_until_change(sn_net):
+    sn_net.query_batch(REQUESTS, workers=2)
+    pool = sn_net.batch_pool[2]
+    sn_net.query_batch(REQUESTS, workers=2)
+    assert sn_net.batch_pool[2] is pool
+    sn_net.insert(Declaration('kant', Association('socrates', 'altura', 1.5)))
+    res = sn_net.query_batch([('query_local', (None, 'socrates', 'altura'))], workers=2)
+    assert sn_net.batch_pool[2] is not pool
+    assert same(res[0], sn_net.query_local(None, 'socrates', 'altura'))
+    sn_net.batch_close()
+    assert sn_net.batch_pool is None
@@ -0,0 +1,26 @@
+import json
+import pytest
+from benchmarks import bench, generators
+from semantic_network import Member
+
+
+def test_generators():
+    z, types, instances = generators.hierarchy_sn(500, depth=3, width=3)
+    assert len(z) == len(z.declarations) == 500
+    assert all(z.predecessor('t', obj) for obj in instances)
+    base = generators._fixture('sn_example').z
+    scaled = generators.scaled_sn(3 * len(base.declarations))
+    assert len(scaled.query_local(rel_type=Member)) == 3 * len(base.query_local(rel_type=Member))
+    assert len(generators.scaled_bn(15).dependencies) == 15
+    assert sum(generators.random_bn(6).jointProb(c) for c in
+               generators.random_bn(6)._iter_conjunctions(['v%d' % i for i in range(6)])) == pytest.approx(1.0)
+
+
+def test_bench_json(tmp_path):
+    out = tmp_path / 'results.json'
+    bench.main(['--sizes', '300', '--bn-sizes', '8', '--calls', '20', '--out', str(out)])
+    results = json.loads(out.read_text())['results']
+    names = {r['benchmark'] for r in results}
+    assert {'query_local', 'query', 'query_cancel', 'query_down', 'query_induce',
+            'jointProb_random', 'individualProb_random', 'query_threads2_writer', 'sharded_query_2'} <= names
+    assert all(r['throughput'] > 0 and 'p50' in r['latency_ms'] for r in results)
@@ -0,0 +1,56 @@
+import random
+import pytest
+from semantic_network import *
+from hierarchy import TypeHierarchy
+from tests.test_aula8 import sn_net2
+
+
+def test_insert_many_matches_insert(sn_net2):
+    z = SemanticNetwork()
+    z.insert(sn_net2.declarations[0])
+    report = z.insert_many(sn_net2.declarations[1:])
+    assert report.count == len(sn_net2.declarations) - 1 and report.rate > 0
+
+    assert str(z) == str(sn_net2)
+    assert z.query_local(e1='socrates', rel_type=Association) == sn_net2.query_local(e1='socrates', rel_type=Association)
+    assert z.query('platao') == sn_net2.query('platao')
+    assert z.hierarchy.up == sn_net2.hierarchy.up
+    assert z.query_local_assoc('homem', 'gosta') == [('carne', 0.40), ('peixe', 0.40)]
+
+
+def test_bulk_load_tuples():
+    z = SemanticNetwork()
+    z.query('socrates')
+    with z.bulk_load() as loader:
+        loader.insert(('descartes', Member, 'socrates', None, 'homem'))
+        loader.insert_many([('darwin', 'Subtype', 'homem', None, 'mamifero'),
+                            ('darwin', AssocNum, 'homem', 'altura', 1.75)])
+        assert z.query_local(e1='socrates') == []
+    assert loader.report.count == 3
+    assert str(z) == '[decl(descartes,member(socrates,homem)), decl(darwin,subtype(homem,mamifero)), ' \
+                     'decl(darwin,altura(homem,1.75))]'
+    assert z.query('socrates') == z.query_local(rel='altura')
+    assert z.predecessor_path('mamifero', 'socrates') == ['mamifero', 'homem', 'socrates']
+
+
+def test_bulk_load_indexes_on_error():
+    z = SemanticNetwork()
+    with pytest.raises(ValueError):
+        with z.bulk_load() as loader:
+            loader.insert(('u', Association, 'a', 'r', 'b'))
+            loader.insert(('u', Association, 'a', 'r'))
+    assert len(z.query_local(e1='a')) == 1
+
+
+def test_add_edges_matches_add_edge():
+    rnd = random.Random(5)
+    edges = [tuple(rnd.sample(range(40), 2)) for _ in range(150)]
+    one, bulk = TypeHierarchy(), TypeHierarchy()
+    for e in edges:
+        one.add_edge(*e)
+    bulk.add_edges(edges[:50])
+    bulk.add_edges(edges[50:])
+    assert bulk.parents == one.parents
+    assert {x: set(a) for (x, a) in bulk.up.items() if a} == {x: set(a) for (x, a) in one.up.items() if a}
+    assert all(bulk.up[x][y][0] == one.up[x][y][0] for x in one.up for y in one.up[x])
+    assert all(bulk.down.get(x, set()) == one.down.get(x, set()) for x in range(40))
@@ -0,0 +1,39 @@
+from itertools import product
+import pytest
+import sof2018h
+import bn_example
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.parametrize('bn', [sof2018h.bn, bn_example.bn])
+def test_batched_joint_prob(bn):
+    compiled = bn.compile()
+    conjunctions = [list(zip(compiled.variables, vals))
+                    for vals in product((True, False), repeat=len(compiled.variables))]
+
+    probs = compiled.jointProb(conjunctions)
+    assert probs == pytest.approx([bn.jointProb(c) for c in conjunctions], rel=1e-12)
+    assert probs.sum() == pytest.approx(1.0)
+
+
+def test_log_space_no_underflow():
+    from bayes_net import BayesNet
+    bn = BayesNet()
+    for i in range(400):
+        bn.add('v%d' % i, [] if i == 0 else [('v%d' % (i - 1), True)], 0.01)
+        if i:
+            bn.add('v%d' % i, [('v%d' % (i - 1), False)], 0.01)
+    compiled = bn.compile()
+    x = np.ones((3, 400), dtype=bool)
+    assert compiled.jointProb(x).tolist() == [0.0] * 3
+    assert compiled.logJointProb(x) == pytest.approx(np.full(3, 400 * np.log(0.01)))
+
+
+def test_incomplete_cpt():
+    from bayes_net import BayesNet
+    bn = BayesNet()
+    bn.add('a', [], 0.5)
+    bn.add('b', [('a', True)], 0.5)
+    with pytest.raises(ValueError):
+        bn.compile()
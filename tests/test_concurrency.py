@@ -0,0 +1,100 @@
+import threading
+import time
+import pytest
+from semantic_network import *
+from rwlock import RWLock
+from tests.test_aula6 import sn_net
+
+
+def test_rwlock_reentrant():
+    lock = RWLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    with lock.read():
+        with lock.read():
+            with pytest.raises(RuntimeError):
+                with lock.write():
+                    pass
+    assert lock.readers == 0 and lock.writer is None
+
+
+def test_rwlock_excludes_readers():
+    lock = RWLock()
+    events = []
+
+    def reader():
+        with lock.read():
+            events.append('read')
+
+    with lock.write():
+        t = threading.Thread(target=reader)
+        t.start()
+        t.join(0.05)
+        events.append('write')
+    t.join()
+    assert events == ['write', 'read']
+
+
+def test_query_result_per_thread(sn_net):
+    z = SemanticNetwork(sn_net.declarations, concurrent=True)
+    z.query_local(user='descartes')
+    other = []
+    t = threading.Thread(target=lambda: other.append(z.query_local(user='darwin')))
+    t.start()
+    t.join()
+    assert all(d.user == 'descartes' for d in z.query_result)
+    assert other[0] and all(d.user == 'darwin' for d in other[0])
+
+
+def test_readers_with_writer(sn_net):
+    z = SemanticNetwork(sn_net.declarations, concurrent=True)
+    base = z.query('socrates', 'altura')
+    extra = Declaration('kant', Association('mamifero', 'altura', 1.5))
+    done, errors = threading.Event(), []
+
+    def write():
+        for _ in range(200):
+            z.remove(z.insert(extra))
+        done.set()
+
+    def read():
+        while not done.is_set():
+            res = z.query('socrates', 'altura')
+            if res != base and res != base + [extra]:
+                errors.append(res)
+
+    threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert z.query('socrates', 'altura') == base
+
+
+def test_query_local_sees_committed_states():
+    n = 2000
+    z = SemanticNetwork(concurrent=True)
+    decls = [Declaration('u%d' % i, Association('x', 'a%d' % i, i)) for i in range(n)]
+    done, sizes = threading.Event(), set()
+
+    def write():
+        for _ in range(20):
+            z.retract(e1='x')
+            time.sleep(0.001)
+            z.insert_many(decls)
+            time.sleep(0.001)
+        done.set()
+
+    def read():
+        while not done.is_set():
+            sizes.add(len(z.query_local(e1='x')))
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sizes <= {0, n}
@@ -0,0 +1,85 @@
+import random
+import time
+import pytest
+from bayes_net import BayesNet
+from cpt import NoisyOr, NoisyAnd, Rules
+from tests.test_pruning import brute
+
+
+def network(rnd):
+    bn = BayesNet()
+    for v in ('a', 'b', 'c'):
+        bn.add(v, [], rnd.uniform(0.1, 0.9))
+    bn.addCpt('or', NoisyOr({'a': 0.9, 'b': 0.6, 'c': 0.3}, leak=0.05))
+    bn.addCpt('and', NoisyAnd({'a': 0.8, 'or': 0.4}, leak=0.9))
+    bn.addCpt('rule', Rules([([('or', True), ('and', True)], 0.95), ([('b', False)], 0.2)], default=0.6))
+    return bn
+
+
+def table(bn):
+    res = BayesNet()
+    for var in bn.dependencies:
+        for (conj, p) in bn.dependencies[var].items():
+            res.add(var, conj, p)
+    return res
+
+
+def test_prob():
+    cpt = NoisyOr({'a': 0.9, 'b': 0.5}, leak=0.1)
+    assert cpt.prob({'a': False, 'b': False}) == pytest.approx(0.1)
+    assert cpt.prob({'a': True, 'b': True}) == pytest.approx(1 - 0.9 * 0.1 * 0.5)
+    cpt = NoisyAnd({'a': 0.9, 'b': 0.5}, leak=0.8)
+    assert cpt.prob({'a': True, 'b': True}) == pytest.approx(0.8)
+    assert cpt.prob({'a': True, 'b': False}) == pytest.approx(0.4)
+    rules = Rules([([('a', True)], 0.7), ([('b', True)], 0.3)], default=0.1)
+    assert rules.mothers == ['a', 'b']
+    assert [rules.prob({'a': a, 'b': b}) for (a, b) in ((True, False), (False, True), (False, False))] == \
+        [0.7, 0.3, 0.1]
+
+
+def test_same_answers_as_full_tables():
+    rnd = random.Random(3)
+    bn = network(rnd)
+    full = table(bn)
+    variables = list(bn.dependencies)
+    for c in bn._iter_conjunctions(variables):
+        assert bn.jointProb(c) == pytest.approx(full.jointProb(c))
+    for var in variables:
+        assert bn.individualProb(var, True) == pytest.approx(full.individualProb(var, True))
+        for _ in range(3):
+            evidence = [(e, rnd.random() < 0.5) for e in rnd.sample([v for v in variables if v != var], 2)]
+            assert bn.conditionalProb(var, True, evidence) == pytest.approx(brute(full, var, evidence)[True])
+    assert bn.junctionTree().marginal('rule')[True] == pytest.approx(full.individualProb('rule', True))
+
+
+def test_pruning_restricts_cpt():
+    bn = network(random.Random(4))
+    pruned = bn.prune(['or'], [('and', True), ('a', True)])
+    assert isinstance(pruned.dependencies['or'], NoisyOr)
+    evidence = [('and', True), ('a', True)]
+    assert bn.conditionalProb('rule', True, evidence) == pytest.approx(brute(table(bn), 'rule', evidence)[True])
+
+
+def test_sampling():
+    bn = network(random.Random(5))
+    evidence = [('rule', True)]
+    exact = bn.conditionalProb('a', True, evidence)
+    for method in ('likelihood', 'gibbs'):
+        est = bn.approximateProb('a', True, evidence, method=method, samples=4000, seed=2)
+        assert est.value == pytest.approx(exact, abs=5 * est.stderr + 1e-2)
+
+
+def test_many_mothers_without_tables():
+    n = 25
+    bn = BayesNet()
+    causes = {'c%d' % i: 0.1 for i in range(n)}
+    for m in causes:
+        bn.add(m, [], 0.2)
+    bn.addCpt('effect', NoisyOr(causes, leak=0.01))
+    start = time.perf_counter()
+    assert bn.jointProb([(m, False) for m in causes] + [('effect', True)]) == pytest.approx(0.8 ** n * 0.01)
+    # P(effect) = 1 - (1 - leak) * (1 - 0.2 * 0.1) ** n
+    assert bn.marginal('effect')[True] == pytest.approx(1 - 0.99 * 0.98 ** n)
+    assert bn.conditionalProb('c0', True, [('effect', True)]) == \
+        pytest.approx(0.2 * (1 - 0.99 * 0.9 * 0.98 ** (n - 1)) / (1 - 0.99 * 0.98 ** n))
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,24 @@
+import types
+import pytest
+import sof2018h
+
+
+def test_iter_conjunctions_order():
+    bn = sof2018h.bn
+    variables = list(bn.dependencies)
+    lazy = bn._iter_conjunctions(variables)
+    assert isinstance(lazy, types.GeneratorType)
+    assert list(lazy) == bn._gen_conjunctions(variables)
+
+
+def test_iter_conjunctions_chunks():
+    bn = sof2018h.bn
+    variables = ['sc', 'pt', 'cp']
+    chunks = [list(bn._iter_conjunctions(variables, a, b)) for (a, b) in [(0, 3), (3, 5), (5, 8)]]
+    assert sum(chunks, []) == bn._gen_conjunctions(variables)
+
+
+def test_individual_prob_workers():
+    bn = sof2018h.bn
+    for var in bn.dependencies:
+        assert bn.individualProb(var, True, workers=2, chunks=5) == pytest.approx(bn.individualProb(var, True))
@@ -0,0 +1,78 @@
+import random
+import pytest
+from semantic_network import *
+from hierarchy import TypeHierarchy
+from tests.test_aula6 import sn_net
+
+
+def bfs_dist(edges, start):
+    dist, frontier = {start: 0}, [start]
+    while frontier:
+        nxt = []
+        for x in frontier:
+            for y in edges.get(x, ()):
+                if y not in dist:
+                    dist[y] = dist[x] + 1
+                    nxt.append(y)
+        frontier = nxt
+    return dist
+
+
+def test_predecessor_direct_parents(sn_net):
+    assert sn_net.predecessor('homem', 'socrates')
+    assert sn_net.predecessor('filosofo', 'socrates')
+    assert not sn_net.predecessor('socrates', 'homem')
+
+
+def test_predecessor_path_diamond():
+    z = SemanticNetwork()
+    z.insert(Declaration('u', Subtype('b', 'a')))
+    z.insert(Declaration('u', Subtype('c', 'b')))
+    z.insert(Declaration('u', Subtype('d', 'c')))
+    z.insert(Declaration('u', Member('x', 'd')))
+    z.insert(Declaration('u', Subtype('d', 'a')))
+    assert z.predecessor_path('a', 'x') == ['a', 'd', 'x']
+    assert z.predecessor_path('b', 'x') == ['b', 'c', 'd', 'x']
+    assert z.predecessor_path('x', 'a') is None
+
+
+def test_closure_random_dag():
+    rnd = random.Random(3)
+    h, edges = TypeHierarchy(), {}
+    for _ in range(300):
+        a, b = sorted(rnd.sample(range(60), 2), reverse=True)
+        h.add_edge(a, b)
+        edges.setdefault(a, set()).add(b)
+
+    for x in range(60):
+        dist = bfs_dist(edges, x)
+        assert h.ancestors(x) == set(dist) - {x}
+        for (y, d) in dist.items():
+            path = h.path(x, y)
+            assert len(path) == d + 1 and path[0] == x and path[-1] == y
+            assert all(q in edges[p] for (p, q) in zip(path, path[1:]))
+
+
+def test_add_edges_in_batches():
+    rnd = random.Random(4)
+    h, edges = TypeHierarchy(), {}
+    for _ in range(30):
+        batch = [tuple(sorted(rnd.sample(range(60), 2), reverse=True)) for _ in range(rnd.randint(1, 20))]
+        h.add_edges(batch)
+        for (a, b) in batch:
+            edges.setdefault(a, set()).add(b)
+        for x in range(60):
+            dist = bfs_dist(edges, x)
+            assert h.ancestors(x) == set(dist) - {x}
+            assert all(len(h.path(x, y)) == d + 1 for (y, d) in dist.items())
+            assert h.descendants(x) == {y for y in range(60) if x in bfs_dist(edges, y) and y != x}
+
+
+def test_add_edges_only_recomputes_below(monkeypatch):
+    h = TypeHierarchy()
+    h.add_edges([('t%d' % i, 't%d' % (i // 2)) for i in range(1, 100)])
+    nodes = []
+    recompute = h._recompute
+    monkeypatch.setattr(h, '_recompute', lambda ns: nodes.append(set(ns)) or recompute(ns))
+    h.add_edges([('o', 't50')])
+    assert nodes == [{'o'}] and h.is_ancestor('t0', 'o')
@@ -0,0 +1,31 @@
+import pytest
+from semantic_network import *
+from tests.test_aula6 import sn_net
+
+
+def linear_query(z, user=None, e1=None, rel=None, rel_type=None, e2=None):
+    return [d for d in z.declarations
+            if (user is None or d.user == user)
+            and (e1 is None or d.relation.entity1 == e1)
+            and (rel is None or d.relation.name == rel)
+            and (rel_type is None or isinstance(d.relation, rel_type))
+            and (e2 is None or d.relation.entity2 == e2)]
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'user': 'descartes'},
+    {'e1': 'socrates'},
+    {'e1': 'socrates', 'rel': 'professor'},
+    {'e2': 'homem', 'rel_type': (Member, Subtype)},
+    {'rel_type': Association},
+    {'user': 'darwin', 'rel_type': Association, 'rel': 'altura'},
+    {'e1': 'inexistente'},
+])
+def test_query_local_index(sn_net, args):
+    assert sn_net.query_local(**args) == linear_query(sn_net, **args)
+
+
+def test_query_local_index_initial_list(sn_net):
+    z = SemanticNetwork(list(sn_net.declarations))
+    assert z.query_local(e1='homem', rel='altura') == sn_net.query_local(e1='homem', rel='altura')
@@ -0,0 +1,41 @@
+import pytest
+import sof2018h
+import bn_example
+from bayes_net import BayesNet
+
+
+@pytest.mark.parametrize('bn', [sof2018h.bn, bn_example.bn])
+def test_calibrated_marginals(bn):
+    jt = bn.junctionTree()
+    for (var, dist) in jt.marginals().items():
+        assert dist[True] == pytest.approx(bn.individualProb(var, True))
+    assert jt.evidenceProb() == pytest.approx(1.0)
+
+
+def test_incremental_evidence():
+    bn = bn_example.bn
+    jt = bn.junctionTree()
+    cliques = jt.cliques
+
+    jt.setEvidence('j', True)
+    jt.setEvidence('m', True)
+    assert jt.cliques is cliques
+    for var in ('r', 't', 'a'):
+        assert jt.marginal(var)[True] == pytest.approx(bn.conditionalProb(var, True, [('j', True), ('m', True)]))
+    assert jt.evidenceProb() == pytest.approx(bn.marginal('j', [('m', True)])[True] * bn.individualProb('m', True))
+
+    jt.setEvidence('m', False)
+    assert jt.marginal('r')[True] == pytest.approx(bn.conditionalProb('r', True, [('j', True), ('m', False)]))
+
+
+def test_disconnected_network():
+    bn = BayesNet()
+    bn.add('a', [], 0.3)
+    bn.add('b', [('a', True)], 0.9)
+    bn.add('b', [('a', False)], 0.2)
+    bn.add('c', [], 0.7)
+    jt = bn.junctionTree()
+    jt.setEvidence('b', True)
+    jt.setEvidence('c', True)
+    assert jt.marginal('a')[True] == pytest.approx(0.27 / (0.27 + 0.14))
+    assert jt.evidenceProb() == pytest.approx((0.27 + 0.14) * 0.7)
@@ -0,0 +1,61 @@
+import random
+from semantic_network import *
+from pattern_query import Pattern
+from tests.test_aula6 import sn_net
+
+
+def test_multi_hop(sn_net):
+    result = sn_net.match([(None, '?x', None, 'homem', Member),
+                           (None, '?x', 'professor', '?y'),
+                           (None, 'filosofo', 'gosta', '?y')])
+    assert sorted(r['?x'] for r in result) == ['platao', 'socrates']
+    assert all(r['?y'] == 'filosofia' for r in result)
+
+
+def test_variables_over_all_fields(sn_net):
+    assert sn_net.match([('?u', 'socrates', 'peso', '?v')]) == [{'?u': 'descartes', '?v': 80},
+                                                                 {'?u': 'darwin', '?v': 75}]
+    types = sn_net.match([(None, 'homem', None, '?t', '?cls')])
+    assert types[0] == {'?t': 'mamifero', '?cls': Subtype}
+    assert [r['?t'] for r in types[1:]] == ['carne', 1.75, 1.85]
+    assert sn_net.match([('?u', '?e', 'gosta', '?x'), ('?u', '?e', 'altura', '?h')]) == [
+        {'?u': 'darwin', '?e': 'homem', '?x': 'carne', '?h': 1.75}]
+    assert sn_net.match([(None, '?x', None, '?x')]) == []
+    assert sn_net.match([Pattern(e1='platao', rel_type='Member', e2='?t')]) == [{'?t': 'homem'}]
+
+
+def test_plan_starts_selective(sn_net):
+    steps = sn_net.explain([(None, '?x', None, '?t', Member), (None, '?x', 'peso', 80)])
+    assert steps[0][0].rel == 'peso'
+    assert steps[1][1] < len(sn_net.declarations)
+
+
+def brute(z, patterns):
+    rows = [{}]
+    for p in patterns:
+        new = []
+        for r in rows:
+            for d in z.declarations:
+                values = (d.user, d.relation.entity1, d.relation.name, d.relation.entity2, type(d.relation))
+                b, ok = dict(r), True
+                for (x, v) in zip(p, values):
+                    if isinstance(x, str) and x.startswith('?'):
+                        ok = ok and b.setdefault(x, v) == v
+                    elif x is not None:
+                        ok = ok and (issubclass(v, x) if isinstance(x, type) else x == v)
+                if ok:
+                    new.append(b)
+        rows = new
+    return {tuple(sorted(r.items(), key=str)) for r in rows}
+
+
+def test_random_against_nested_loops():
+    rnd = random.Random(3)
+    ents = ['a', 'b', 'c', 'd', 'e']
+    z = SemanticNetwork([Declaration(rnd.choice('uv'), Association(rnd.choice(ents), rnd.choice('pq'), rnd.choice(ents)))
+                         for _ in range(60)])
+    for _ in range(20):
+        patterns = [(None, '?x', 'p', '?y'), (rnd.choice([None, 'u']), '?y', rnd.choice('pq'), '?z'),
+                    (None, '?z', 'q', rnd.choice(['?x', 'a', '?w']))]
+        rnd.shuffle(patterns)
+        assert {tuple(sorted(r.items(), key=str)) for r in z.match(patterns)} == brute(z, patterns)
@@ -0,0 +1,43 @@
+import json
+import threading
+import profiling
+from semantic_network import *
+from bayes_net import BayesNet
+from tests.test_aula6 import sn_net
+import sof2018h
+
+
+def test_profile_scope(sn_net):
+    original = SemanticNetwork.query
+    with profiling.profile() as p:
+        assert SemanticNetwork.query is not original
+        sn_net.query('socrates', 'altura')
+        sn_net.query('socrates', 'altura')
+        sn_net.query2('platao')
+        sn_net.query_local(e1='socrates')
+    assert SemanticNetwork.query is original
+
+    stats = p.snapshot()
+    query = stats['SemanticNetwork.query']
+    assert query['calls'] == 3 and query['returned'] == 4 + 4 + 9
+    assert query['cache_hits'] >= 1 and 0 < query['cache_hit_rate'] < 1
+    assert query['max_depth'] == 2
+    local = stats['SemanticNetwork.query_local']
+    assert local['scanned'] >= local['returned'] > 0
+    assert json.loads(p.to_json())['SemanticNetwork.query2']['calls'] == 1
+
+
+def test_profile_only_current_thread(sn_net):
+    with profiling.profile() as p:
+        t = threading.Thread(target=sn_net.query, args=('socrates',))
+        t.start()
+        t.join()
+    assert p.snapshot() == {}
+
+
+def test_enable_disable():
+    profiling.enable()
+    sof2018h.bn.jointProb([(v, True) for v in sof2018h.bn.dependencies])
+    p = profiling.disable()
+    assert p.snapshot()['BayesNet.jointProb']['calls'] == 1
+    assert 'wrapper' not in BayesNet.jointProb.__qualname__
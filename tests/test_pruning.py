@@ -0,0 +1,57 @@
+import random
+import pytest
+import sof2018h
+from benchmarks import generators
+
+
+def brute(bn, variable, evidence):
+    variables = list(bn.dependencies)
+    dist = {True: 0.0, False: 0.0}
+    for c in bn._iter_conjunctions(variables):
+        values = dict(c)
+        if all(values[e] == v for (e, v) in evidence):
+            dist[values[variable]] += bn.jointProb(c)
+    total = sum(dist.values())
+    return {val: p / total for (val, p) in dist.items()}
+
+
+def test_relevant_sof2018h():
+    bn = sof2018h.bn
+    assert bn.relevant(['sc']) == {'sc'}
+    assert bn.relevant(['cp']) == {'cp', 'sc', 'pa', 'pt'}
+    # pa is observed: pt only reaches cp through it
+    assert bn.relevant(['cp'], [('pa', True)]) == {'cp', 'sc', 'pa'}
+    assert bn.relevant(['sc'], [('pt', True)]) == {'sc'}
+    assert set(bn.prune(['sc']).dependencies) == {'sc'}
+
+
+def test_pruned_answers_sof2018h():
+    bn = sof2018h.bn
+    for var in bn.dependencies:
+        assert bn.individualProb(var, True) == pytest.approx(brute(bn, var, [])[True])
+    evidence = [('fr', True), ('cnl', False)]
+    for var in ('sc', 'pt', 'cp', 'pa'):
+        assert bn.conditionalProb(var, True, evidence) == pytest.approx(brute(bn, var, evidence)[True])
+
+
+def test_pruned_random_networks():
+    rnd = random.Random(5)
+    for seed in range(5):
+        bn = generators.random_bn(9, max_parents=2, seed=seed)
+        variables = list(bn.dependencies)
+        for _ in range(4):
+            var = rnd.choice(variables)
+            evidence = [(e, rnd.random() < 0.5) for e in rnd.sample([v for v in variables if v != var], 3)]
+            assert bn.marginal(var, evidence)[True] == pytest.approx(brute(bn, var, evidence)[True])
+            assert bn.prune([var], evidence).marginal(var, [(e, v) for (e, v) in evidence
+                                                            if e in bn.relevant([var], evidence)])[True] == \
+                pytest.approx(brute(bn, var, evidence)[True])
+
+
+def test_evidence_cut_from_its_mothers():
+    bn = sof2018h.bn
+    pruned = bn.prune(['cp'], [('pa', True)])
+    assert pruned.dependencies['pa'] == {frozenset(): 1.0}
+    assert bn.conditionalProb('cp', True, [('pa', True)]) == pytest.approx(brute(bn, 'cp', [('pa', True)])[True])
+    est = bn.approximateProb('cp', True, [('pa', True), ('cnl', True)], samples=4000, seed=1)
+    assert est.value == pytest.approx(brute(bn, 'cp', [('pa', True), ('cnl', True)])[True], abs=5 * est.stderr + 1e-3)
@@ -0,0 +1,40 @@
+import pytest
+from semantic_network import *
+from tests.test_aula6 import sn_net
+
+
+def test_cache_hits_shared_ancestors(sn_net):
+    sn_net.query('socrates', 'altura')
+    misses = sn_net.cache_info().misses
+    sn_net.query('platao', 'altura')
+    info = sn_net.cache_info()
+    # only platao's own entries (query and local associations) are new
+    assert info.misses == misses + 2
+    assert info.hits >= 2
+
+
+def test_cache_invalidated_on_insert(sn_net):
+    assert sn_net.query_assoc_value('platao', 'altura') == 1.75
+    before = sn_net.query_cancel('filosofo', 'altura')
+
+    sn_net.insert(Declaration('darwin', Association('homem', 'altura', 1.85)))
+    sn_net.insert(Declaration('simoes', Association('homem', 'altura', 1.85)))
+
+    assert sn_net.query_assoc_value('platao', 'altura') == 1.85
+    assert len(sn_net.query('platao', 'altura')) == 6
+    assert 'filosofo' in sn_net.cache.keys_by_entity
+    assert sn_net.query_cancel('filosofo', 'altura') == before
+
+
+def test_cache_invalidated_on_new_member(sn_net):
+    assert sn_net.query('aristoteles', 'gosta') != []
+    sn_net.insert(Declaration('damasio', Member('aristoteles', 'filosofo')))
+    assert len(sn_net.query('aristoteles', 'gosta')) == 2
+
+
+def test_cache_lru_bound(sn_net):
+    z = SemanticNetwork(list(sn_net.declarations), cache_size=2)
+    for entity in ['socrates', 'platao', 'aristoteles', 'homem']:
+        z.query(entity)
+    assert z.cache_info().currsize == 2
+    assert sum(len(keys) for keys in z.cache.keys_by_entity.values()) == 2
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import tempfile
+import time
+import pytest
+import sof2018h
+from profiling import METHODS
+from query_service import QueryService, QueryClient
+from semantic_network import Member
+from tests.test_aula6 import sn_net
+
+
+def run(service, client_fn, unix=False):
+    async def main():
+        if unix:
+            path = os.path.join(tempfile.mkdtemp(), 'sock')
+            server = await service.serve_unix(path)
+            client = await QueryClient.connect_unix(path)
+        else:
+            server = await service.serve_tcp()
+            client = await QueryClient.connect_tcp(*server.sockets[0].getsockname()[:2])
+        try:
+            return await client_fn(client)
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
+    try:
+        return asyncio.run(main())
+    finally:
+        service.close()
+
+
+def test_queries_over_tcp(sn_net):
+    service = QueryService({'sn': sn_net, 'bn': sof2018h.bn}, workers=1)
+
+    async def client_fn(client):
+        return await asyncio.gather(client.call('sn', 'query_assoc_value', 'socrates', 'altura'),
+                                    client.call('sn', 'query_local', e1='socrates', rel_type='Member'),
+                                    client.call('bn', 'conditionalProb', 'cp', True, [['pa', True]]),
+                                    client.call('bn', 'jointProb', [[v, True] for v in sof2018h.bn.dependencies]),
+                                    client.request('sn', 'remove', 0),
+                                    client.request('nothing', 'query', 'x'))
+
+    (value, members, cond, joint, remove, unknown) = run(service, client_fn)
+    assert value == sn_net.query_assoc_value('socrates', 'altura')
+    assert [(m['entity1'], m['relation'], m['entity2']) for m in members] == \
+        [(d.relation.entity1, 'Member', d.relation.entity2) for d in sn_net.query_local(e1='socrates', rel_type=Member)]
+    assert cond == pytest.approx(sof2018h.bn.conditionalProb('cp', True, [('pa', True)]))
+    assert joint == sof2018h.bn.jointProb([(v, True) for v in sof2018h.bn.dependencies])
+    assert not remove['ok'] and 'ValueError' in remove['error']
+    assert not unknown['ok'] and 'KeyError' in unknown['error']
+
+
+def test_identical_requests_are_coalesced(sn_net):
+    service = QueryService({'sn': sn_net, 'bn': sof2018h.bn}, workers=0)
+    query = sn_net.query
+
+    def slow_query(*args):
+        time.sleep(0.05)
+        return query(*args)
+    sn_net.query = slow_query
+
+    async def client_fn(client):
+        results = await asyncio.gather(*[client.call('sn', 'query', 'socrates', 'altura') for _ in range(5)],
+                                       client.call('sn', 'query', 'platao', 'altura'))
+        return results, await client.call('service', 'stats')
+
+    (results, stats) = run(service, client_fn, unix=True)
+    assert all(r == results[0] for r in results[:5])
+    assert stats['computed'] == 2 and stats['coalesced'] == 4
+    assert stats['methods']['sn.query']['calls'] == 6
+    assert stats['methods']['sn.query']['latency_ms']['max'] >= 50
+
+
+def test_backpressure(sn_net):
+    service = QueryService({'sn': sn_net}, workers=0, max_pending=2)
+
+    async def client_fn(client):
+        return await asyncio.gather(*[client.call('sn', 'query_local', None, e) for e in
+                                      ['socrates', 'platao', 'aristoteles', 'homem'] * 10])
+
+    results = run(service, client_fn)
+    assert len(results) == 40 and all(results[:4])
+
+
+def test_serves_the_profiled_methods(sn_net):
+    service = QueryService({'sn': sn_net}, workers=0)
+
+    async def client_fn(client):
+        return await client.call('sn', 'match', [[None, '?x', None, 'homem', 'Member']])
+
+    assert run(service, client_fn) == sn_net.match([(None, '?x', None, 'homem', Member)])
+    assert all(callable(getattr(cls, name)) for (cls, names) in METHODS.items() for name in names)
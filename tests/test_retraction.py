@@ -0,0 +1,109 @@
+import pickle
+import random
+import pytest
+from semantic_network import *
+from hierarchy import TypeHierarchy
+import sn_store
+from tests.test_aula6 import sn_net
+from tests.test_aula7 import compare_decl_lists
+
+
+def test_stable_ids(sn_net):
+    did = sn_net.insert(Declaration('kant', Association('kant', 'gosta', 'razao')))
+    assert sn_net.store[did].user == 'kant'
+    first = sn_net.id_of(sn_net.declarations[0])
+    sn_net.remove(first)
+    assert sn_net.store[did].user == 'kant'
+    assert sn_net.remove(did) == did
+    with pytest.raises(ValueError):
+        sn_net.remove(did)
+
+
+def test_remove_equal_declaration(sn_net):
+    n = len(sn_net.declarations)
+    sn_net.remove(Declaration('darwin', Subtype('mamifero', 'vertebrado')))
+    assert len(sn_net.declarations) == n - 1
+    assert not sn_net.predecessor('vertebrado', 'socrates')
+    with pytest.raises(ValueError):
+        sn_net.remove(Declaration('darwin', Association('mamifero', 'subtype', 'vertebrado')))
+
+
+def test_retract_user(sn_net):
+    assert sn_net.retract_user('descartes') == 9
+    assert sn_net.query_local(user='descartes') == []
+    assert 'descartes' not in sn_net.list_users()
+    assert sn_net.list_objects() == ['socrates']
+    assert sn_net.query('socrates', 'altura') == []
+    assert compare_decl_lists(sn_net.query('homem', 'altura'), [
+        Declaration('simao', Association('homem', 'altura', 1.85)),
+        Declaration('darwin', Association('homem', 'altura', 1.75))])
+
+
+def test_retract(sn_net):
+    assert sn_net.retract(e1='socrates', rel='professor') == 4
+    assert sn_net.list_local_associations('socrates') == ['peso']
+    assert sn_net.retract(rel_type=Member, e2='homem') == 3
+    assert sn_net.query('platao', 'altura') == []
+    assert sn_net.retract(e1='ninguem') == 0
+
+
+def test_remove_edges_recomputes_closure():
+    rnd = random.Random(9)
+    edges = [tuple(rnd.sample(range(30), 2)) for _ in range(120)]
+    h = TypeHierarchy()
+    for (k, e) in enumerate(edges):
+        h.add_edge(*e, k)
+    for k in rnd.sample(range(len(edges)), 80):
+        h.remove_edge(*edges[k], k)
+        edges[k] = None
+        fresh = TypeHierarchy()
+        fresh.add_edges([(*e, k) for (k, e) in enumerate(edges) if e is not None])
+        assert h.parents == fresh.parents
+        assert {x: list(p) for (x, p) in h.parents.items()} == {x: list(p) for (x, p) in fresh.parents.items()}
+        assert {x: list(c) for (x, c) in h.children.items()} == {x: list(c) for (x, c) in fresh.children.items()}
+        assert {x: {y: d for (y, (d, _)) in a.items()} for (x, a) in h.up.items()} == \
+               {x: {y: d for (y, (d, _)) in a.items()} for (x, a) in fresh.up.items()}
+        assert h.down == fresh.down
+        for (x, ancestors) in h.up.items():
+            for y in ancestors:
+                path = h.path(x, y)
+                assert all(q in h.parents[p] for (p, q) in zip(path, path[1:]))
+
+
+def test_parents_follow_earliest_live_declaration(tmp_path):
+    z = SemanticNetwork()
+    first = z.insert(Declaration('u', Member('o', 'A')))
+    z.insert(Declaration('u', Member('o', 'B')))
+    z.insert(Declaration('v', Member('o', 'A')))
+    z.insert(Declaration('u', Association('A', 'cor', 'azul')))
+    z.insert(Declaration('u', Association('B', 'cor', 'verde')))
+    z.remove(first)
+    assert z._parents('o') == ('B', 'A')
+    assert z.query_assoc_value('o', 'cor') == 'verde'
+    assert pickle.loads(pickle.dumps(z)).query_assoc_value('o', 'cor') == 'verde'
+    path = str(tmp_path / 'net.snap')
+    sn_store.save(z, path)
+    m = sn_store.load(path)
+    assert m._parents('o') == ('B', 'A')
+    assert m.query_assoc_value('o', 'cor') == 'verde'
+    m.close()
+
+    z.insert(Declaration('w', Member('o', 'C')))
+    z.remove(z.id_of(Declaration('u', Member('o', 'B'))))
+    assert z._parents('o') == ('A', 'C')
+    assert z.hierarchy.children['A'] == {'o': 1}
+
+
+def test_mapped_removal(sn_net, tmp_path):
+    path = str(tmp_path / 'net.snap')
+    sn_store.save(sn_net, path)
+    m = sn_store.load(path)
+    assert m.retract_user('damasio') == 2
+    m.remove(m.insert(Declaration('kant', Member('kant', 'homem'))))
+    m.close()
+
+    m = sn_store.load(path)
+    assert len(m.declarations) == len(sn_net.declarations) - 2
+    assert m.query_local(user='damasio') == [] and m.query_local(user='kant') == []
+    assert not m.predecessor('filosofo', 'socrates')
+    assert 'damasio' not in m.list_users()
@@ -0,0 +1,42 @@
+import pytest
+import sof2018h
+import bn_example
+
+
+@pytest.mark.parametrize('method', ['rejection', 'likelihood', 'gibbs'])
+def test_estimates(method):
+    bn = bn_example.bn
+    evidence = [('j', True)]
+    exact = bn.conditionalProb('a', True, evidence)
+    e = bn.approximateProb('a', True, evidence, method=method, samples=20000, seed=7)
+    assert e.samples == 20000
+    assert e.low <= e.value <= e.high
+    assert abs(e.value - exact) < 5 * e.stderr
+
+
+def test_reproducible_with_workers():
+    bn = sof2018h.bn
+    e1 = bn.approximateProb('fr', True, [('cp', False)], samples=8000, seed=11)
+    e2 = bn.approximateProb('fr', True, [('cp', False)], samples=8000, seed=11, workers=2)
+    assert e1 == e2
+
+
+def test_target_stderr():
+    bn = sof2018h.bn
+    e = bn.approximateProb('sc', True, samples=10 ** 6, stderr=0.01, seed=5)
+    assert e.stderr <= 0.01 and e.samples < 10 ** 6
+    assert e.value == pytest.approx(0.6, abs=0.05)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        sof2018h.bn.approximateProb('sc', True, method='magic')
+
+
+@pytest.mark.parametrize('samples', [100, 2100, 4003])
+def test_samples_is_a_cap(samples):
+    bn = sof2018h.bn
+    e = bn.approximateProb('sc', True, samples=samples, seed=3)
+    assert e.samples == samples
+    e = bn.approximateProb('sc', True, [('cp', True)], method='rejection', samples=samples, seed=3, workers=2)
+    assert e.samples == samples
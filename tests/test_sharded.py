@@ -0,0 +1,83 @@
+import threading
+import time
+import pytest
+from semantic_network import *
+from sharded import ShardedSemanticNetwork
+from tests.test_aula6 import sn_net
+
+
+def same(a, b):
+    return [str(d) for d in a] == [str(d) for d in b]
+
+
+@pytest.fixture
+def sharded(sn_net):
+    with ShardedSemanticNetwork(sn_net.declarations, shards=3) as z:
+        yield z
+
+
+def test_same_answers(sn_net, sharded):
+    assert same(sharded.declarations, sn_net.declarations)
+    for kwargs in ({'e1': 'socrates'}, {'user': 'descartes'}, {'rel_type': Member}, {'e2': 'filosofia'}):
+        assert same(sharded.query_local(**kwargs), sn_net.query_local(**kwargs))
+    for (e, rel) in (('socrates', 'altura'), ('platao', None), ('filosofo', 'altura')):
+        assert same(sharded.query(e, rel), sn_net.query(e, rel))
+        assert same(sharded.query_cancel(e, rel), sn_net.query_cancel(e, rel))
+    assert sharded.predecessor_path('vertebrado', 'socrates') == ['vertebrado', 'mamifero', 'homem', 'socrates']
+    for method in ('list_associations', 'list_objects', 'list_users', 'list_types'):
+        assert sorted(map(str, getattr(sharded, method)())) == sorted(map(str, getattr(sn_net, method)()))
+    assert sharded.list_local_associations('socrates') == sn_net.list_local_associations('socrates')
+    assert sharded.associations_by_user('descartes') == sn_net.associations_by_user('descartes')
+
+
+def test_insert_remove(sn_net, sharded):
+    did = sharded.insert(Declaration('kant', Association('mamifero', 'altura', 1.5)))
+    assert did == len(sn_net.declarations)
+    assert len(sharded) == len(sn_net) + 1
+    assert str(sharded.query('socrates', 'altura')[-1]) == 'decl(kant,altura(mamifero,1.5))'
+    sharded.remove(Declaration('descartes', Member('socrates', 'homem')))
+    assert sharded.query('socrates', 'altura') == []
+    assert not sharded.predecessor('homem', 'socrates')
+    with pytest.raises(ValueError):
+        sharded.remove(did + 1)
+
+
+def test_entity2_associations(sn_net):
+    sn_net.insert(Declaration('kant', Association('aristoteles', 'admira', 'homem')))
+    sn_net.insert(Declaration('kant', Association('homem', 'admira', 'platao')))
+    with ShardedSemanticNetwork(sn_net.declarations, shards=4) as z:
+        assert same(z.query('socrates', 'admira'), sn_net.query('socrates', 'admira'))
+        assert len(z.query('socrates', 'admira')) == 2
+
+
+def test_queries_during_hierarchy_changes(sn_net, sharded):
+    edge = Declaration('kant', Subtype('homem', 'primata'))
+    sharded.insert(Declaration('kant', Association('primata', 'altura', 1.5)))
+    without = str(sharded.query('socrates', 'altura'))
+    sharded.insert(edge)
+    states = {without, str(sharded.query('socrates', 'altura'))}
+    assert len(states) == 2
+    done, seen, errors = threading.Event(), set(), []
+
+    def write():
+        for _ in range(30):
+            sharded.remove(edge)
+            time.sleep(0.001)
+            sharded.insert(edge)
+            time.sleep(0.001)
+        done.set()
+
+    def read():
+        try:
+            while not done.is_set():
+                seen.add(str(sharded.query('socrates', 'altura')))
+                sharded.predecessor_path('mamifero', 'socrates')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors and seen <= states
@@ -0,0 +1,59 @@
+import pytest
+from semantic_network import *
+from tests.test_aula8 import sn_net2
+
+
+def expected(z):
+    decls = z.declarations
+    return {
+        'list_associations': {d.relation.name for d in decls if isinstance(d.relation, Association)},
+        'list_objects': {d.relation.entity1 for d in decls if isinstance(d.relation, Member)},
+        'list_users': {d.user for d in decls},
+        'list_types': {d.relation.entity2 for d in decls if isinstance(d.relation, (Member, Subtype))},
+        'list_local_associations': {d.relation.name for d in decls
+                                    if isinstance(d.relation, Association) and d.relation.entity1 == 'socrates'},
+        'list_relations_by_user': {d.relation.name for d in decls if d.user == 'darwin'},
+        'associations_by_user': len({d.relation.name for d in decls
+                                     if d.user == 'descartes' and isinstance(d.relation, Association)}),
+        'list_local_associations_by_entity': {(d.relation.name, d.user) for d in decls
+                                              if isinstance(d.relation, Association) and d.relation.entity1 == 'socrates'},
+    }
+
+
+def actual(z):
+    return {
+        'list_associations': set(z.list_associations()),
+        'list_objects': set(z.list_objects()),
+        'list_users': set(z.list_users()),
+        'list_types': set(z.list_types()),
+        'list_local_associations': set(z.list_local_associations('socrates')),
+        'list_relations_by_user': set(z.list_relations_by_user('darwin')),
+        'associations_by_user': z.associations_by_user('descartes'),
+        'list_local_associations_by_entity': set(z.list_local_associations_by_entity('socrates')),
+    }
+
+
+def test_statistics_after_inserts(sn_net2):
+    assert actual(sn_net2) == expected(sn_net2)
+    assert sn_net2.stats.local_assocs['socrates']['professor'] == 4
+
+
+def test_statistics_after_removals(sn_net2):
+    for decl in list(sn_net2.declarations):
+        if decl.user in ('darwin', 'simoes') or decl.relation.entity1 == 'aristoteles':
+            sn_net2.remove(decl)
+            assert actual(sn_net2) == expected(sn_net2)
+    assert 'darwin' not in sn_net2.list_users()
+    assert 'aristoteles' not in sn_net2.list_objects()
+    assert 'vertebrado' not in sn_net2.list_types()
+
+
+def test_remove_updates_queries(sn_net2):
+    member = sn_net2.query_local(e1='socrates', rel_type=Member)[0]
+    assert len(sn_net2.query('socrates', 'altura')) == 4
+    sn_net2.remove(member)
+    assert sn_net2.query('socrates', 'altura') == []
+    assert not sn_net2.predecessor('homem', 'socrates')
+    assert sn_net2.predecessor('filosofo', 'socrates')
+    with pytest.raises(ValueError):
+        sn_net2.remove(member)
@@ -0,0 +1,108 @@
+import pickle
+import pytest
+from semantic_network import *
+import sn_store
+from tests.test_aula6 import sn_net
+from tests.test_aula8 import sn_net2
+
+
+def same(l1, l2):
+    return [str(d) for d in l1] == [str(d) for d in l2]
+
+
+def test_snapshot_roundtrip(sn_net2, tmp_path):
+    path = str(tmp_path / 'net.snap')
+    sn_store.save(sn_net2, path)
+    m = sn_store.load(path)
+
+    assert same(m.declarations, sn_net2.declarations)
+    for args in [{'e1': 'socrates'}, {'rel_type': AssocNum}, {'e2': 1.75, 'user': 'simao'},
+                 {'rel': 'gosta', 'rel_type': Association}, {'e1': 'ninguem'}]:
+        assert same(m.query_local(**args), sn_net2.query_local(**args))
+    assert same(m.query('platao'), sn_net2.query('platao'))
+    assert m.query_local_assoc('socrates', 'pai') == ('sofronisco', 2 / 3)
+    assert m.predecessor_path('vertebrado', 'socrates') == ['vertebrado', 'mamifero', 'homem', 'socrates']
+
+
+def test_value_types(tmp_path):
+    path = str(tmp_path / 'net.snap')
+    z = SemanticNetwork()
+    for v in [1, 1.0, True, 'um', None, 80]:
+        z.insert(Declaration('u', Association('x', 'v', v)))
+    sn_store.save(z, path)
+    m = sn_store.load(path)
+    assert [type(d.relation.entity2) for d in m.declarations] == [int, float, bool, str, type(None), int]
+    assert same(m.query_local(e2=80.0), z.query_local(e2=80.0))
+    # numeros iguais coincidem, como na rede em memoria
+    for v in [1.0, 1, True, 0, False, 'um', None]:
+        assert same(m.query_local(e2=v), z.query_local(e2=v))
+    assert len(m.query_local(e2=1.0)) == 3
+
+
+def test_append_log(sn_net, tmp_path):
+    path = str(tmp_path / 'net.snap')
+    sn_store.save(sn_net, path)
+    m = sn_store.load(path)
+    m.insert(Declaration('damasio', Member('kant', 'filosofo')))
+    m.insert(Declaration('damasio', AssocNum('kant', 'altura', 1.6)))
+    m.close()
+
+    m = sn_store.load(path)
+    assert len(m.declarations) == len(sn_net.declarations) + 2
+    assert m.query_assoc_value('kant', 'altura') == 1.6
+    assert m.predecessor('filosofo', 'kant')
+    assert len(pickle.loads(pickle.dumps(m)).declarations) == len(m.declarations)
+
+    sn_store.save(m, path)
+    assert open(path + '.log').read() == ''
+    assert len(sn_store.load(path).query_local(e1='kant')) == 2
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / 'other'
+    path.write_bytes(b'x' * 1024)
+    with pytest.raises(ValueError):
+        sn_store.load(str(path))
+
+
+def test_log_replay_is_lazy(sn_net, tmp_path):
+    path = str(tmp_path / 'net.snap')
+    sn_store.save(sn_net, path)
+    m = sn_store.load(path)
+    m.insert(Declaration('damasio', Member('kant', 'filosofo')))
+    m.insert(Declaration('damasio', Association('kant', 'gosta', 'carne')))
+    m.remove(Declaration('darwin', Association('homem', 'gosta', 'carne')))
+    m.close()
+
+    m = sn_store.load(path)
+    assert m._hierarchy is None and m._stats is None
+    z = SemanticNetwork(sn_net.declarations)
+    z.insert(Declaration('damasio', Member('kant', 'filosofo')))
+    z.insert(Declaration('damasio', Association('kant', 'gosta', 'carne')))
+    z.remove(Declaration('darwin', Association('homem', 'gosta', 'carne')))
+    assert sorted(m.list_associations()) == sorted(z.list_associations())
+    assert sorted(m.list_local_associations('kant')) == sorted(z.list_local_associations('kant'))
+    assert same(m.query('kant', 'gosta'), z.query('kant', 'gosta'))
+    assert m.predecessor('mamifero', 'kant') == z.predecessor('mamifero', 'kant')
+
+
+
+@pytest.mark.parametrize('built', [False, True])
+def test_bulk_load_after_load(tmp_path, built):
+    path = str(tmp_path / 'net.snap')
+    z = SemanticNetwork([Declaration('u', Association('sopackages', 'pai', 'a')),
+                         Declaration('u', Member('platao', 'homem'))])
+    sn_store.save(z, path)
+    new = [Declaration('u', Association('sopackages', 'pai', 'b')), Declaration('u', Member('sopackages', 'homem'))]
+    m = sn_store.load(path)
+    if built:
+        m.list_users()
+        m.predecessor('homem', 'platao')
+    m.insert_many(new)
+    z.insert_many(new)
+    assert m.stats.users == {'u': 4}
+    assert m.list_users() == z.list_users()
+    assert m.query_local_assoc('sopackages', 'pai') == z.query_local_assoc('sopackages', 'pai')
+    assert m.predecessor('homem', 'sopackages')
+    m.retract(e1='sopackages', rel_type=Member)
+    assert not m.predecessor('homem', 'sopackages')
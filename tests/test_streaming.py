@@ -0,0 +1,29 @@
+import pytest
+from semantic_network import *
+from tests.test_aula6 import sn_net
+
+
+def test_iter_query_local(sn_net):
+    full = sn_net.query_local(rel_type=Association)
+    assert list(sn_net.iter_query_local(rel_type=Association)) == full
+    assert list(sn_net.iter_query_local(rel_type=Association, limit=3)) == full[:3]
+    assert list(sn_net.iter_query_local(rel_type=Association, limit=3, offset=2)) == full[2:5]
+    assert list(sn_net.iter_query_local(e1='socrates', offset=100)) == []
+
+
+def test_iter_query(sn_net):
+    assert list(sn_net.iter_query('platao')) == sn_net.query('platao')
+    assert list(sn_net.iter_query('socrates', 'altura', limit=2, offset=1)) == \
+        sn_net.query('socrates', 'altura')[1:3]
+
+
+def test_iter_query_early_termination(sn_net):
+    it = sn_net.iter_query_local(e1='socrates')
+    assert str(next(it)) == 'decl(descartes,professor(socrates,filosofia))'
+
+
+def test_query_result_only_set_by_query_local(sn_net, capsys):
+    sn_net.query_local(user='simoes')
+    sn_net.query('platao')
+    sn_net.show_query_result()
+    assert capsys.readouterr().out == 'decl(simoes,professor(socrates,matematica))\n'
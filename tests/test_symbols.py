@@ -0,0 +1,28 @@
+import pickle
+import pytest
+from semantic_network import *
+from symbols import SymbolTable, symbols
+
+
+def test_symbol_table():
+    t = SymbolTable()
+    assert t.intern('homem') == t.intern('homem') == 0
+    assert len({t.intern(1), t.intern(1.0), t.intern(True)}) == 3
+    assert t.value(t.lookup(1.0)) == 1.0 and isinstance(t.value(t.lookup(1.0)), float)
+    assert t.lookup('mamifero') is None
+
+
+def test_slotted_relations():
+    d = Declaration('darwin', AssocNum('homem', 'altura', 1.75))
+    assert not hasattr(d, '__dict__') and not hasattr(d.relation, '__dict__')
+    assert (d.user, d.relation.entity1, d.relation.name, d.relation.entity2) == ('darwin', 'homem', 'altura', 1.75)
+    assert isinstance(d.relation._entity1, int)
+    assert Member('socrates', 'homem')._entity2 == Subtype('homem', 'mamifero')._entity1
+
+
+def test_pickle_uses_values():
+    d = Declaration('darwin', Subtype('homem', 'mamifero'))
+    state = pickle.dumps(d)
+    assert b'mamifero' in state
+    copy = pickle.loads(state)
+    assert str(copy) == str(d) and type(copy.relation) is Subtype
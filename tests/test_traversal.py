@@ -0,0 +1,45 @@
+import pytest
+from semantic_network import *
+from traversal import Traversal
+from tests.test_aula6 import sn_net
+
+GRAPH = {'a': ['b', 'c'], 'b': ['d'], 'c': ['d', 'a'], 'd': []}
+
+
+def test_dfs_preorder_and_cycles():
+    t = Traversal(GRAPH.get)
+    assert list(t.walk('a')) == [('a', 0), ('b', 1), ('d', 2), ('c', 1)]
+    assert t.cycles == [('c', 'a')]
+
+
+def test_bfs_and_depth_limit():
+    assert list(Traversal(GRAPH.get, breadth_first=True).walk('a')) == [('a', 0), ('b', 1), ('c', 1), ('d', 2)]
+    assert [n for (n, _) in Traversal(GRAPH.get, max_depth=1).walk('a')] == ['a', 'b', 'c']
+
+
+def test_deep_hierarchy():
+    n = 1200
+    z = SemanticNetwork([Declaration('u', Subtype('t%d' % (i + 1), 't%d' % i)) for i in range(n)] +
+                        [Declaration('u', Association('t0', 'altura', 1.5))])
+    assert [str(d) for d in z.query('t%d' % n, 'altura')] == ['decl(u,altura(t0,1.5))']
+    assert len(z.query_down('t0', 'altura', False)) == 1
+    assert z.predecessor_path('t0', 't%d' % n)[-1] == 't%d' % n
+    assert SemanticNetwork(z.declarations, max_depth=10).query('t%d' % n, 'altura') == []
+
+
+def test_subtype_cycle(sn_net):
+    sn_net.insert(Declaration('darwin', Subtype('vertebrado', 'homem')))
+    assert len(sn_net.query('socrates', 'altura')) == 4
+    assert len(sn_net.query_cancel('socrates', 'altura')) == 3
+    assert len(sn_net.query_down('homem', 'altura')) == 1
+    assert sn_net.predecessor('socrates', 'socrates') is False
+
+
+def test_diamond_visited_once(sn_net):
+    sn_net.insert(Declaration('darwin', Member('socrates', 'mamifero')))
+    sn_net.insert(Declaration('simao', Member('socrates', 'homem')))
+    result = [str(d) for d in sn_net.query('socrates', 'altura')]
+    assert len(result) == len(set(result)) == 4
+    assert [str(d) for d in sn_net.query_cancel('socrates', 'altura')] == [
+        'decl(descartes,altura(homem,1.75))', 'decl(simao,altura(homem,1.85))',
+        'decl(darwin,altura(homem,1.75))', 'decl(descartes,altura(mamifero,1.2))']
@@ -0,0 +1,46 @@
+from itertools import product
+import pytest
+import sof2018h
+import bn_example
+
+
+def enumeration_conditional(bn, variable, value, evidence):
+    variables = list(bn.dependencies)
+    num = den = 0.0
+    for vals in product((True, False), repeat=len(variables)):
+        conj = list(zip(variables, vals))
+        d = dict(conj)
+        if all(d[e] == v for (e, v) in evidence):
+            p = bn.jointProb(conj)
+            den += p
+            num += p if d[variable] == value else 0.0
+    return num / den
+
+
+@pytest.mark.parametrize('bn', [sof2018h.bn, bn_example.bn])
+@pytest.mark.parametrize('heuristic', ['min_fill', 'min_degree'])
+def test_marginals_match_individual_prob(bn, heuristic):
+    for var in bn.dependencies:
+        for val in (True, False):
+            assert bn.conditionalProb(var, val, heuristic=heuristic) == pytest.approx(bn.individualProb(var, val))
+
+
+def test_conditional_queries():
+    for (bn, variable, evidence) in [(bn_example.bn, 'r', [('j', True), ('m', True)]),
+                                     (bn_example.bn, 'a', [('t', False), ('m', True)]),
+                                     (sof2018h.bn, 'pt', [('fr', True), ('cp', False)])]:
+        assert bn.conditionalProb(variable, True, evidence) == \
+            pytest.approx(enumeration_conditional(bn, variable, True, evidence))
+
+
+def test_observed_variable():
+    assert sof2018h.bn.marginal('sc', [('sc', True)]) == {True: 1.0, False: 0.0}
+    assert sof2018h.bn.conditionalProb('sc', True, [('sc', True), ('pt', False)]) == 1.0
+    assert bn_example.bn.conditionalProb('a', True, [('a', False), ('m', True)]) == 0.0
+
+
+def test_elimination_order():
+    bn = sof2018h.bn
+    order = bn.eliminationOrder(['pa', 'fr', 'cnl', 'pt'])
+    assert sorted(order) == ['cnl', 'fr', 'pa', 'pt']
+    assert order[0] in ('cnl', 'fr')
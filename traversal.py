@@ -0,0 +1,58 @@
+# Percursos iterativos de grafos
+# -- pesquisa em profundidade (pre-ordem, como a recursiva) ou em largura,
+#    com pilha/fila explicita; cada no e visitado uma so vez, os ciclos
+#    sao detetados e a profundidade pode ser limitada
+#
+from collections import deque
+
+
+# classe Traversal
+# -- neighbours(no) da os vizinhos de um no, pela ordem a visitar;
+#    walk(inicio) gera os pares (no, profundidade) visitados
+#
+class Traversal:
+    def __init__(self, neighbours, max_depth=None, breadth_first=False):
+        self.neighbours = neighbours
+        self.max_depth = max_depth
+        self.breadth_first = breadth_first
+        self.cycles = []  # arestas (no, vizinho) que fecham um ciclo
+
+    def walk(self, start):
+        return self._bfs(start) if self.breadth_first else self._dfs(start)
+
+    def _expand(self, depth) -> bool:
+        return self.max_depth is None or depth < self.max_depth
+
+    def _dfs(self, start):
+        visited, on_path = set(), set()
+        stack = [(start, 0, False)]
+        while stack:
+            (node, depth, leaving) = stack.pop()
+            if leaving:
+                on_path.discard(node)
+                continue
+            if node in visited:
+                continue
+            visited.add(node)
+            yield node, depth
+
+            on_path.add(node)
+            stack.append((node, depth, True))
+            if self._expand(depth):
+                for n in reversed(list(self.neighbours(node))):
+                    if n in on_path:
+                        self.cycles.append((node, n))
+                    elif n not in visited:
+                        stack.append((n, depth + 1, False))
+
+    # em largura, os ciclos nao se distinguem de nos ja visitados
+    def _bfs(self, start):
+        visited, queue = {start}, deque([(start, 0)])
+        while queue:
+            (node, depth) = queue.popleft()
+            yield node, depth
+            if self._expand(depth):
+                for n in self.neighbours(node):
+                    if n not in visited:
+                        visited.add(n)
+                        queue.append((n, depth + 1))